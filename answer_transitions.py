@@ -0,0 +1,200 @@
+from detailed_table import load_detailed_table
+from metrics_report import DATASETS, find_detailed_files
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+# Outcome of a question on a dataset variant, from its counts of predictions: ADH if one prediction is adherent,
+# otherwise RES if one is resistant, INC if all are incorrect, NONE without predictions or results for the question
+OUTCOMES = ["ADH", "RES", "INC", "NONE"]
+ADH, RES, INC, NONE = range(len(OUTCOMES))
+CUBE_VERSION = 1
+
+def outcome_codes(table, dataset):
+    """
+    Return the int8 outcome code of every question of a detailed table on a dataset variant.
+    """
+    adh, res, inc = (table[f"{dataset}_{field}"] for field in ("adh", "res", "inc"))
+    return np.select([adh > 0, res > 0, inc > 0], [ADH, RES, INC], default=NONE).astype(np.int8)
+
+class OutcomeCube:
+    """
+    Outcome codes of every question for every run (method-model) and dataset variant, as an int8 array
+    of shape (runs, variants, questions), with an index of the questions of each (run, variant, outcome)
+    so that queries only intersect sorted arrays of question positions.
+    """
+
+    def __init__(self, runs, variants, ids, codes):
+        self.runs = list(runs)
+        self.variants = list(variants)
+        self.ids = np.asarray(ids, dtype=object)
+        self.codes = codes
+        self._run_pos = {run: i for i, run in enumerate(self.runs)}
+        self._variant_pos = {variant: i for i, variant in enumerate(self.variants)}
+        # Stable sort of the questions by outcome: the positions with a given outcome are one slice of the order
+        self._order = np.argsort(codes, axis=2, kind="stable")
+        self._bounds = np.stack([np.searchsorted(row, np.arange(len(OUTCOMES) + 1))
+                                 for row in np.take_along_axis(codes, self._order, axis=2).reshape(-1, codes.shape[2])])
+        self._bounds = self._bounds.reshape(len(self.runs), len(self.variants), len(OUTCOMES) + 1)
+
+    @classmethod
+    def from_tables(cls, tables):
+        """
+        Build the cube from the {run name: DetailedTable} of the runs, aligned on the union of their question ids
+        (in order of first occurrence); a question missing from a run has the NONE outcome there.
+        """
+        positions = {}
+        for table in tables.values():
+            for question_id in table["id"]:
+                positions.setdefault(question_id, len(positions))
+        codes = np.full((len(tables), len(DATASETS), len(positions)), NONE, dtype=np.int8)
+        for i, table in enumerate(tables.values()):
+            rows = np.fromiter((positions[question_id] for question_id in table["id"]), dtype=np.int64, count=len(table))
+            for j, dataset in enumerate(DATASETS):
+                if f"{dataset}_adh" in table:
+                    codes[i, j, rows] = outcome_codes(table, dataset)
+        return cls(tables, DATASETS, list(positions), codes)
+
+    def select(self, run, variant):
+        """
+        Return the outcome codes of a run on a variant, one per question.
+        """
+        try:
+            return self.codes[self._run_pos[run], self._variant_pos[variant]]
+        except KeyError as e:
+            raise KeyError(f"Unknown run or variant {e.args[0]!r}; runs: {', '.join(self.runs)}") from None
+
+    def positions(self, run, variant, outcomes):
+        """
+        Return the sorted positions of the questions whose outcome for the run and variant is one of outcomes.
+        """
+        self.select(run, variant)
+        i, j = self._run_pos[run], self._variant_pos[variant]
+        parts = [self._order[i, j, self._bounds[i, j, code]:self._bounds[i, j, code + 1]] for code in outcomes]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def query(self, conditions, excluded=()):
+        """
+        Return the ids of the questions meeting all the conditions, except those also meeting all the excluded ones.
+        A condition is a (run, variant, outcome codes) triple.
+        """
+        matched = np.arange(len(self.ids))
+        for run, variant, outcomes in conditions:
+            matched = np.intersect1d(matched, self.positions(run, variant, outcomes), assume_unique=True)
+        if excluded:
+            dropped = matched
+            for run, variant, outcomes in excluded:
+                dropped = np.intersect1d(dropped, self.positions(run, variant, outcomes), assume_unique=True)
+            matched = np.setdiff1d(matched, dropped, assume_unique=True)
+        return self.ids[matched].tolist()
+
+    def transitions(self, source, target):
+        """
+        Return the matrix counting the questions with outcome a on source and b on target at [a, b],
+        source and target being (run, variant) pairs, e.g. two variants of a run or one variant of two runs.
+        """
+        a, b = self.select(*source).astype(np.int64), self.select(*target).astype(np.int64)
+        return np.bincount(a * len(OUTCOMES) + b, minlength=len(OUTCOMES) ** 2).reshape(len(OUTCOMES), len(OUTCOMES))
+
+    def save(self, path, signature):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = json.dumps({"version": CUBE_VERSION, "signature": signature, "runs": self.runs, "variants": self.variants,
+                           "ids": self.ids.tolist()}, ensure_ascii=False)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, codes=self.codes, meta=np.array(meta))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        Return the cube saved at path, or None if it is missing or was built from other detailed files.
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != CUBE_VERSION or meta.get("signature") != signature:
+                return None
+            return cls(meta["runs"], meta["variants"], meta["ids"], data["codes"])
+
+def detailed_signature(runs):
+    return {run: [path, os.stat(path).st_size, os.stat(path).st_mtime_ns] for run, path in runs.items()}
+
+def load_cube(directory="results_detailed"):
+    """
+    Load the outcome cube of the detailed files of a directory, from {directory}/.cache/outcomes.npz
+    if none of the files changed since it was saved, otherwise building and saving it.
+    """
+    runs = {f"{method}-{model}": path for (method, model), path in sorted(find_detailed_files(directory).items())}
+    signature = detailed_signature(runs)
+    cache_path = os.path.join(directory, ".cache", "outcomes.npz")
+    cube = OutcomeCube.load(cache_path, signature)
+    if cube is None:
+        cube = OutcomeCube.from_tables({run: load_detailed_table(path) for run, path in runs.items()})
+        cube.save(cache_path, signature)
+    return cube
+
+def parse_selector(text):
+    """
+    Parse "{method}-{model}:{variant}" into a (run, variant) pair.
+    """
+    run, sep, variant = text.rpartition(":")
+    if not sep or not run or not variant:
+        raise ValueError(f"Expected {{method}}-{{model}}:{{variant}}, got {text!r}")
+    return run, variant
+
+def parse_condition(text):
+    """
+    Parse "{method}-{model}:{variant}={outcome}[,{outcome}...]" into a (run, variant, outcome codes) triple.
+    """
+    selector, sep, outcomes = text.partition("=")
+    if not sep:
+        raise ValueError(f"Expected {{method}}-{{model}}:{{variant}}={{outcome}}, got {text!r}")
+    codes = []
+    for outcome in outcomes.split(","):
+        if outcome.upper() not in OUTCOMES:
+            raise ValueError(f"Unknown outcome {outcome!r}, expected one of {', '.join(OUTCOMES)}")
+        codes.append(OUTCOMES.index(outcome.upper()))
+    return (*parse_selector(selector), codes)
+
+def format_transitions(matrix, source, target):
+    width = max(len(outcome) for outcome in OUTCOMES) + 1
+    cell = max(width, len(str(matrix.max())) + 1)
+    lines = [f"{':'.join(source)} (rows) -> {':'.join(target)} (columns)",
+             " " * width + "".join(f"{outcome:>{cell}}" for outcome in OUTCOMES)]
+    for outcome, row in zip(OUTCOMES, matrix):
+        lines.append(f"{outcome:<{width}}" + "".join(f"{count:>{cell}}" for count in row))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Question outcome transitions between dataset variants and runs.")
+    parser.add_argument("--dir", default="results_detailed", help="directory of the detailed files (default: results_detailed)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    matrix_parser = subparsers.add_parser("matrix", help="print the outcome transition matrix between two run:variant selectors")
+    matrix_parser.add_argument("source", help="{method}-{model}:{variant}, e.g. GCR-nano:slight")
+    matrix_parser.add_argument("target", help="{method}-{model}:{variant}, e.g. GCR-nano:comical")
+    query_parser = subparsers.add_parser("query", help="print the ids of the questions meeting outcome conditions")
+    query_parser.add_argument("conditions", nargs="+",
+                              help="{method}-{model}:{variant}={outcome}[,{outcome}...], all of which must hold, e.g. GCR-nano:slight=RES")
+    query_parser.add_argument("--not", dest="excluded", nargs="+", default=[],
+                              help="conditions which, if they all hold too, exclude the question")
+    query_parser.add_argument("--count", action="store_true", help="only print the number of matching questions")
+    args = parser.parse_args(argv)
+
+    try:
+        cube = load_cube(args.dir)
+        if args.command == "matrix":
+            source, target = parse_selector(args.source), parse_selector(args.target)
+            print(format_transitions(cube.transitions(source, target), source, target))
+        else:
+            ids = cube.query([parse_condition(c) for c in args.conditions], [parse_condition(c) for c in args.excluded])
+            print(len(ids) if args.count else "\n".join(ids))
+    except (KeyError, ValueError) as e:
+        print(f"Error: {e.args[0]}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
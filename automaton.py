@@ -0,0 +1,85 @@
+from collections import deque
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton matching many patterns against a sequence in a single linear scan.
+    Patterns and sequences are sequences of hashable symbols: characters of a string,
+    or tokens such as the hops of a path. An empty pattern matches every sequence.
+    """
+
+    def __init__(self, patterns):
+        # State 0 is the root; goto[s] maps a symbol to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        # out[s] holds the ids of the patterns recognized when the automaton reaches state s
+        self.out = [[]]
+        # Empty patterns occur at every position and are kept apart from the states
+        self.empty = []
+        self.n_patterns = 0
+        for pattern in patterns:
+            if not pattern:
+                self.empty.append(self.n_patterns)
+                self.n_patterns += 1
+                continue
+            state = 0
+            for symbol in pattern:
+                next_state = self.goto[state].get(symbol)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][symbol] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = next_state
+            self.out[state].append(self.n_patterns)
+            self.n_patterns += 1
+        self._link()
+
+    def _link(self):
+        """
+        Compute the failure links breadth-first and merge the outputs along them.
+        """
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and symbol not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(symbol, 0)
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
+
+    def _step(self, state, symbol):
+        goto, fail = self.goto, self.fail
+        while state and symbol not in goto[state]:
+            state = fail[state]
+        return goto[state].get(symbol, 0)
+
+    def search(self, sequence):
+        """
+        Yield (end, pattern_id) for every occurrence of a pattern ending right before position end of the sequence.
+        """
+        state = 0
+        for i in self.empty:
+            yield 0, i
+        for end, symbol in enumerate(sequence, 1):
+            state = self._step(state, symbol)
+            for i in self.out[state]:
+                yield end, i
+            for i in self.empty:
+                yield end, i
+
+    def contains_any(self, sequence) -> bool:
+        """
+        Check if at least one of the patterns occurs in the sequence.
+        """
+        if self.empty:
+            return True
+        out = self.out
+        state = 0
+        for symbol in sequence:
+            state = self._step(state, symbol)
+            if out[state]:
+                return True
+        return False
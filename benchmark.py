@@ -0,0 +1,275 @@
+from utils import (build_graph, build_compact_graph, path_exists_on_graph_gcr, path_exists_on_graph_rog,
+                   is_path_correct, analyze_prediction, split_path, tog_paths_existence, FUZZY_THRESHOLD)
+from detail_results import process_item, process_bundle, DATASETS
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+# Default shape of the synthetic questions, close to the WebQSP subgraphs
+DEFAULT_CONFIG = {
+    "questions": 100,
+    "nodes": 300,
+    "hub_degree": 60,
+    "relations_per_edge": 2,
+    "path_length": 3,
+    "paths": 10,
+    "relations": 40,
+    "answers": 3,
+    "seed": 0,
+}
+
+def random_walk(rng, adjacency, start, length):
+    """
+    Walk length hops from start along the directed triplets and return the visited entities and relations,
+    or None if the walk reaches a node without successors.
+    """
+    entities, relations = [start], []
+    for _ in range(length):
+        successors = adjacency.get(entities[-1])
+        if not successors:
+            return None
+        relation, tail = rng.choice(successors)
+        relations.append(relation)
+        entities.append(tail)
+    return entities, relations
+
+def generate_question(rng, index, config):
+    """
+    Generate a WebQSP-like question: a subgraph of config["nodes"] entities around a question entity of degree
+    config["hub_degree"], config["relations_per_edge"] relations on each edge, answers at the end of a ground path of
+    config["path_length"] hops, and config["paths"] generated paths per method, half of them existing on the subgraph.
+    Return the PQ record, the items of the five datasets, and the GCR and RoG results on each dataset.
+    """
+    nodes = [f"q{index}.e{i}" for i in range(config["nodes"])]
+    relations = [f"ns.rel.r{i}" for i in range(config["relations"])]
+    q_entity = nodes[0]
+
+    edges = set()
+    for _ in range(config["hub_degree"]):
+        edges.add((q_entity, rng.choice(nodes[1:])))
+    for _ in range(2 * config["nodes"]):
+        edges.add((rng.choice(nodes), rng.choice(nodes)))
+    graph, adjacency = [], {}
+    for h, t in sorted(edges):
+        for r in rng.sample(relations, config["relations_per_edge"]):
+            graph.append([h, r, t])
+            adjacency.setdefault(h, []).append((r, t))
+
+    walks = [w for w in (random_walk(rng, adjacency, q_entity, config["path_length"]) for _ in range(config["paths"] + 1)) if w]
+    if not walks:
+        walks = [([q_entity], [])]
+    ground_entities, ground_relations = walks[0]
+    answers = sorted({ground_entities[-1]} | set(rng.sample(nodes, config["answers"] - 1)))
+
+    def entity_path(entities, relations):
+        hops = [entities[0]]
+        for r, e in zip(relations, entities[1:]):
+            hops += [r, e]
+        return " -> ".join(hops)
+
+    gcr_paths, rog_paths, tog_paths = [], [], []
+    for i, (entities, rels) in enumerate(walks[1:] or walks):
+        if i % 2:
+            # Missing paths: a relation that does not label the hop, or an unknown entity
+            rels = list(rels)
+            if rels:
+                rels[-1] = rng.choice(relations)
+            entities = entities[:-1] + [f"q{index}.missing{i}"]
+        gcr_paths.append(entity_path(entities, rels))
+        rog_paths.append(" -> ".join(rels))
+        # ToG paths: one [head, relation, tail] triplet per depth level
+        tog_paths.append([[[h, r, t]] for h, r, t in zip(entities, rels, entities[1:])])
+
+    pq = {"id": f"synthetic-{index}", "prediction": [rng.choice(answers + nodes)]}
+    datasets_dict, results = {}, {"GCR": {}, "RoG": {}, "ToG": {}}
+    for dataset in DATASETS:
+        modified = answers if dataset == "original" else [f"{a} ({dataset})" for a in answers]
+        datasets_dict[dataset] = {"id": pq["id"], "answer": modified, "a_entity": modified, "q_entity": [q_entity], "graph": graph}
+        predictions = [rng.choice(modified + answers + nodes) for _ in range(3)]
+        results["GCR"][dataset] = {"id": pq["id"], "prediction": predictions, "gen_paths": gcr_paths,
+                                   "ground_paths": [entity_path(ground_entities, ground_relations)]}
+        results["RoG"][dataset] = {"id": pq["id"], "prediction": predictions, "gen_paths": rog_paths,
+                                   "ground_paths": [" -> ".join(ground_relations)]}
+        # As in the real ToG results, the ground paths are only in the RoG records
+        results["ToG"][dataset] = {"id": pq["id"], "prediction": predictions, "gen_paths": tog_paths}
+    return pq, datasets_dict, results
+
+def generate_dataset(config):
+    rng = random.Random(config["seed"])
+    return [generate_question(rng, i, config) for i in range(config["questions"])]
+
+def benchmarks(questions):
+    """
+    Return the benchmarks as {name: function}, each function running once over the synthetic questions
+    and returning the number of operations done (graphs built, paths checked, predictions classified, questions processed).
+    """
+    originals = [datasets_dict["original"] for _, datasets_dict, _ in questions]
+    compact_graphs = [build_compact_graph(item["graph"], undirected=True) for item in originals]
+    gcr = [(g, [split_path(p) for p in results["GCR"]["original"]["gen_paths"]], item["q_entity"][0])
+           for g, item, (_, _, results) in zip(compact_graphs, originals, questions)]
+    rog = [(g, [split_path(p) for p in results["RoG"]["original"]["gen_paths"]], item["q_entity"][0])
+           for g, item, (_, _, results) in zip(compact_graphs, originals, questions)]
+    tog = [(g, results["ToG"]["original"]["gen_paths"]) for g, (_, _, results) in zip(compact_graphs, questions)]
+    correctness = [(results["GCR"]["original"]["gen_paths"], results["GCR"]["original"]["ground_paths"])
+                   for _, _, results in questions]
+    predictions = [(results["GCR"][dataset]["prediction"], datasets_dict["original"]["answer"], datasets_dict[dataset]["answer"])
+                   for _, datasets_dict, results in questions for dataset in DATASETS]
+    bundles = {method: [({d: json.dumps(item) for d, item in datasets_dict.items()},
+                         {d: json.dumps(record) for d, record in results[method].items()}, json.dumps(pq),
+                         {d: json.dumps(record) for d, record in results["RoG"].items()} if method == "ToG" else None)
+                        for pq, datasets_dict, results in questions]
+               for method in ("GCR", "RoG", "ToG")}
+
+    def run_build_graph():
+        for item in originals:
+            build_graph(item["graph"], undirected=True)
+        return len(originals)
+
+    def run_build_compact_graph():
+        for item in originals:
+            build_compact_graph(item["graph"], undirected=True)
+        return len(originals)
+
+    def run_path_check(search, cases):
+        n = 0
+        for graph, paths, start in cases:
+            for path in paths:
+                search(graph, path, start)
+            n += len(paths)
+        return n
+
+    def run_tog_paths_existence(use_set=None):
+        n = 0
+        for graph, paths in tog:
+            tog_paths_existence(paths, graph, use_set=use_set)
+            n += sum(len(level) for path in paths for level in path)
+        return n
+
+    def run_is_path_correct():
+        n = 0
+        for paths, ground_paths in correctness:
+            for path in paths:
+                is_path_correct(path, ground_paths)
+            n += len(paths)
+        return n
+
+    def run_analyze_prediction(fuzzy=None):
+        n = 0
+        for preds, answer_original, answer_modified in predictions:
+            for prediction in preds:
+                analyze_prediction(prediction, answer_original, answer_modified, fuzzy=fuzzy)
+            n += len(preds)
+        return n
+
+    def run_process_item(method):
+        for pq, datasets_dict, results in questions:
+            records = results[method]
+            if method == "ToG":
+                records = {d: dict(record, ground_paths=results["RoG"][d]["ground_paths"]) for d, record in records.items()}
+            process_item(pq, datasets_dict, records, method)
+        return len(questions)
+
+    def run_end_to_end(method):
+        for bundle in bundles[method]:
+            process_bundle(bundle, method)
+        return len(bundles[method])
+
+    return {
+        "build_graph": run_build_graph,
+        "build_compact_graph": run_build_compact_graph,
+        "path_exists_on_graph_gcr": lambda: run_path_check(path_exists_on_graph_gcr, gcr),
+        "path_exists_on_graph_rog": lambda: run_path_check(path_exists_on_graph_rog, rog),
+        "tog_paths_existence": run_tog_paths_existence,
+        "tog_paths_existence[set]": lambda: run_tog_paths_existence(use_set=True),
+        "tog_paths_existence[csr]": lambda: run_tog_paths_existence(use_set=False),
+        "is_path_correct": run_is_path_correct,
+        "analyze_prediction": run_analyze_prediction,
+        "analyze_prediction[fuzzy]": lambda: run_analyze_prediction(fuzzy=FUZZY_THRESHOLD),
+        "process_item[GCR]": lambda: run_process_item("GCR"),
+        "process_item[RoG]": lambda: run_process_item("RoG"),
+        "process_item[ToG]": lambda: run_process_item("ToG"),
+        "end_to_end[GCR]": lambda: run_end_to_end("GCR"),
+        "end_to_end[RoG]": lambda: run_end_to_end("RoG"),
+        "end_to_end[ToG]": lambda: run_end_to_end("ToG"),
+    }
+
+def measure(func, repeat=3):
+    """
+    Return the best throughput (operations per second) over repeat runs, and the peak memory (KiB)
+    allocated by one more run traced with tracemalloc, so that tracing does not slow down the timed runs.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_ops = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ops": n_ops, "seconds": best, "throughput": n_ops / best if best else float("inf"), "peak_kib": peak / 1024}
+
+def compare(results, baseline, threshold):
+    """
+    Return the regressions against the baseline: the benchmarks whose throughput dropped, or whose peak memory grew,
+    by more than threshold (a fraction of the baseline value).
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result["throughput"] < reference["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {result['throughput']:.1f}/s < baseline {reference['throughput']:.1f}/s")
+        if result["peak_kib"] > reference["peak_kib"] * (1 + threshold):
+            regressions.append(f"{name}: peak memory {result['peak_kib']:.0f} KiB > baseline {reference['peak_kib']:.0f} KiB")
+    return regressions
+
+def main(config, repeat=3, only=None, baseline_path=None, save_baseline_path=None, threshold=0.2):
+    print(f"Generating {config['questions']} synthetic questions...")
+    questions = generate_dataset(config)
+    results = {}
+    for name, func in benchmarks(questions).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(func, repeat=repeat)
+        r = results[name]
+        print(f"{name:<28} {r['ops']:>8} ops  {r['seconds']:9.4f} s  {r['throughput']:12.1f} ops/s  peak {r['peak_kib']:10.0f} KiB")
+
+    if save_baseline_path:
+        with open(save_baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"Baseline saved to {save_baseline_path}")
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["config"] != config:
+            print("Warning: the baseline was measured with a different configuration")
+        regressions = compare(results, baseline["results"], threshold)
+        if regressions:
+            print(f"Regressions beyond {threshold:.0%} of the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regression beyond {threshold:.0%} of the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the graph building, path checking and scoring functions on synthetic questions.")
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, default=value, help=f"(default: {value})")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the best one is kept (default: 3)")
+    parser.add_argument("--only", nargs="+", default=None, help="names of the benchmarks to run (default: all)")
+    parser.add_argument("--baseline", default=None, help="JSON baseline to compare with; exit with status 1 on regression")
+    parser.add_argument("--save-baseline", default=None, help="write the results as a JSON baseline to this path")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="tolerated slowdown or memory growth relative to the baseline (default: 0.2)")
+    args = parser.parse_args()
+    config = {key: getattr(args, key) for key in DEFAULT_CONFIG}
+    sys.exit(main(config, repeat=args.repeat, only=args.only, baseline_path=args.baseline,
+                  save_baseline_path=args.save_baseline, threshold=args.threshold))
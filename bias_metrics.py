@@ -1,4 +1,5 @@
-from utils import read_jsonl, compute_prior_bias, compute_context_bias
+from utils import compute_prior_bias, compute_context_bias
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -8,7 +9,7 @@ def main():
     for model in models:
         for method in methods:            
             path = f"results_detailed/{method}-{model}-detailed.jsonl"
-            item_list = read_jsonl(path)
+            item_list = load_detailed_table(path)
 
             #Compute prior bias for the original dataset and context bias for the altered datasets
             pb = compute_prior_bias(item_list, datasets[0])
@@ -0,0 +1,210 @@
+from detailed_table import load_detailed_table
+from metrics_report import DATASETS, find_detailed_files, pct
+import argparse
+import json
+import sys
+import numpy as np
+from functools import partial
+from multiprocessing import Pool
+
+def ratio_metrics(table, method):
+    """
+    Express the metrics of a detailed file as ratios of per-question sums, sum(numerator) / sum(denominator),
+    so that a resample of the questions only needs the column sums of the resampled rows.
+    Return the metric names and the numerator and denominator matrices (one row per question, one column per metric).
+    The rates are computed per question for GCR and RoG, and per prediction over the questions with at least
+    one existing path for ToG, as in metrics_report; the biases are the ones of compute_prior_bias and compute_context_bias.
+    """
+    names, numerators, denominators = [], [], []
+
+    def add(name, numerator, denominator):
+        names.append(name)
+        numerators.append(np.asarray(numerator, dtype=np.float64))
+        denominators.append(np.asarray(denominator, dtype=np.float64))
+
+    ones = np.ones(len(table))
+    for dataset in DATASETS:
+        adh, res, inc = (table[f"{dataset}_{field}"] for field in ("adh", "res", "inc"))
+        if method == "ToG":
+            with_path = table[f"{dataset}_path_existing"] >= 1
+            total = (adh + res + inc) * with_path
+            for field, values in (("adh", adh), ("res", res), ("inc", inc)):
+                add(f"{dataset}_{field}", values * with_path, total)
+        else:
+            for field, values in (("adh", adh), ("res", res), ("inc", inc)):
+                add(f"{dataset}_{field}", values, ones)
+            with_path = table[f"{dataset}_path_correct"] >= 1
+            if dataset == DATASETS[0]:
+                mask = with_path & (table["pq_adh"] == 0)
+                add("prior_bias", inc * mask, mask)
+            else:
+                mask = with_path & (table["pq_adh"] == 1)
+                add(f"{dataset}_context_bias", adh * mask, mask)
+    return names, np.stack(numerators, axis=1), np.stack(denominators, axis=1)
+
+def paired_comparisons(names):
+    """
+    Return the (variant metric, original metric) pairs compared on the same questions: each rate of each altered dataset
+    against the same rate on the original dataset.
+    """
+    pairs = []
+    for dataset in DATASETS[1:]:
+        for field in ("adh", "res", "inc"):
+            if f"{dataset}_{field}" in names:
+                pairs.append((f"{dataset}_{field}", f"{DATASETS[0]}_{field}"))
+    return pairs
+
+def bootstrap_ratios(numerators, denominators, n_resamples=10000, seed=0, block_size=500):
+    """
+    Resample the questions with replacement n_resamples times and return the (n_resamples, n_metrics) matrix
+    of the resampled ratios, NaN where a resample has a zero denominator.
+    Each block of resamples is drawn as a matrix of multinomial counts of the questions, and the sums of all
+    the metrics over all the resamples of the block come from a single matrix product.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(numerators)
+    samples = np.empty((n_resamples, numerators.shape[1]))
+    if n == 0:
+        samples.fill(np.nan)
+        return samples
+    pvals = np.full(n, 1 / n)
+    for start in range(0, n_resamples, block_size):
+        stop = min(start + block_size, n_resamples)
+        counts = rng.multinomial(n, pvals, size=stop - start).astype(np.float64)
+        num = counts @ numerators
+        den = counts @ denominators
+        with np.errstate(divide="ignore", invalid="ignore"):
+            samples[start:stop] = np.where(den > 0, num / den, np.nan)
+    return samples
+
+def point_estimates(numerators, denominators):
+    num, den = numerators.sum(axis=0), denominators.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+def percentile_interval(samples, confidence=0.95):
+    """
+    Return the lower and upper percentile bootstrap bounds of each column, ignoring the NaN resamples.
+    """
+    alpha = (1 - confidence) / 2
+    bounds = np.full((2, samples.shape[1]), np.nan)
+    valid = ~np.isnan(samples).all(axis=0)
+    if valid.any():
+        bounds[:, valid] = np.nanquantile(samples[:, valid], [alpha, 1 - alpha], axis=0)
+    return bounds
+
+def paired_p_value(differences):
+    """
+    Two-sided bootstrap p-value of a zero difference: twice the smaller share of resampled differences on either side of 0.
+    """
+    differences = differences[~np.isnan(differences)]
+    if len(differences) == 0:
+        return None
+    p = 2 * min((differences <= 0).mean(), (differences >= 0).mean())
+    return float(min(p, 1.0))
+
+def _value(x):
+    return None if np.isnan(x) else float(x)
+
+def bootstrap_run(run, n_resamples=10000, confidence=0.95, seed=0):
+    """
+    Bootstrap the metrics of one detailed file: confidence intervals of every metric and paired tests
+    of each altered dataset against the original one, over the same resampled questions.
+    """
+    (method, model), path = run
+    table = load_detailed_table(path)
+    names, numerators, denominators = ratio_metrics(table, method)
+    samples = bootstrap_ratios(numerators, denominators, n_resamples=n_resamples, seed=seed)
+    estimates = point_estimates(numerators, denominators)
+    lower, upper = percentile_interval(samples, confidence)
+    metrics = {name: {"estimate": _value(estimates[i]), "ci": [_value(lower[i]), _value(upper[i])]}
+               for i, name in enumerate(names)}
+
+    position = {name: i for i, name in enumerate(names)}
+    comparisons = []
+    for variant, original in paired_comparisons(names):
+        a, b = position[variant], position[original]
+        differences = samples[:, a] - samples[:, b]
+        diff_lower, diff_upper = percentile_interval(differences[:, None], confidence)[:, 0]
+        comparisons.append({
+            "metric": variant, "baseline": original,
+            "difference": _value(estimates[a] - estimates[b]),
+            "ci": [_value(diff_lower), _value(diff_upper)],
+            "p_value": paired_p_value(differences),
+        })
+    return {"method": method, "model": model, "path": path, "n_questions": len(table),
+            "metrics": metrics, "comparisons": comparisons}
+
+def compute_bootstrap(runs, n_resamples=10000, confidence=0.95, seed=0, workers=1):
+    """
+    Bootstrap every detailed file, optionally with a pool of worker processes (one file per task).
+    Each file gets its own seed derived from seed, so the results do not depend on the number of workers.
+    """
+    runs = sorted(runs.items())
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(runs))]
+    tasks = list(zip(runs, seeds))
+    func = partial(_bootstrap_task, n_resamples=n_resamples, confidence=confidence)
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.map(func, tasks)
+    else:
+        results = list(map(func, tasks))
+    return {"n_resamples": n_resamples, "confidence": confidence, "seed": seed, "runs": results}
+
+def _bootstrap_task(task, n_resamples=10000, confidence=0.95):
+    run, seed = task
+    return bootstrap_run(run, n_resamples=n_resamples, confidence=confidence, seed=seed)
+
+def interval(ci):
+    return f"[{pct(ci[0])}, {pct(ci[1])}]"
+
+def signed_points(value):
+    return "n/a" if value is None else f"{value * 100:+.1f}pp"
+
+def format_bootstrap(report):
+    """
+    Render the intervals and the paired tests as text.
+    """
+    lines = [f"== {report['confidence']:.0%} bootstrap intervals ({report['n_resamples']} resamples) =="]
+    for run in report["runs"]:
+        metrics = run["metrics"]
+        for dataset in DATASETS:
+            rates = ", ".join(f"{field.capitalize()}: {pct(metrics[f'{dataset}_{field}']['estimate'])} "
+                              f"{interval(metrics[f'{dataset}_{field}']['ci'])}" for field in ("adh", "res", "inc"))
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - {rates}")
+        biases = [name for name in metrics if name.endswith("bias")]
+        if biases:
+            lines.append(f"Model: {run['model']}, Method: {run['method']} -> " + ", ".join(
+                f"{name}: {pct(metrics[name]['estimate'])} {interval(metrics[name]['ci'])}" for name in biases))
+
+    lines.append("\n== Paired tests against the original dataset ==")
+    for run in report["runs"]:
+        for c in run["comparisons"]:
+            p_value = "n/a" if c["p_value"] is None else f"{c['p_value']:.4f}"
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, {c['metric']} vs {c['baseline']} - "
+                         f"Diff: {signed_points(c['difference'])} [{signed_points(c['ci'][0])}, {signed_points(c['ci'][1])}], p: {p_value}")
+    return "\n".join(lines)
+
+def report_bootstrap(directory="results_detailed", n_resamples=10000, confidence=0.95, seed=0, workers=1, json_path=None):
+    report = compute_bootstrap(find_detailed_files(directory), n_resamples=n_resamples, confidence=confidence,
+                               seed=seed, workers=workers)
+    print(format_bootstrap(report))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals and paired tests of the detailed results.")
+    parser.add_argument("--dir", default="results_detailed", help="directory of the detailed files (default: results_detailed)")
+    parser.add_argument("--resamples", type=int, default=10000, help="number of bootstrap resamples (default: 10000)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals (default: 0.95)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the resampling (default: 0)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes, one detailed file each (default: 1)")
+    parser.add_argument("--json", default=None, help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+    report_bootstrap(directory=args.dir, n_resamples=args.resamples, confidence=args.confidence, seed=args.seed,
+                     workers=args.workers, json_path=args.json)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import importlib
+import runpy
+import shlex
+import sys
+from time import perf_counter
+
+# Subcommands: name -> (module run as a script, whether it reads detailed tables, description).
+# Modules are only imported when their command runs, so a command does not pay for loading the others' dependencies.
+COMMANDS = {
+    "detail": ("detail_results", False, "produce the detailed per-question results of ToG, RoG and GCR"),
+    "pipeline": ("pipeline", False, "run the stages whose inputs changed: graph stores, detailed results, reports"),
+    "dataset-metrics": ("dataset_metrics", False, "statistics and subgraph topology of the datasets"),
+    "delta": ("dataset_delta", False, "convert the altered datasets to delta files"),
+    "benchmark": ("benchmark", False, "benchmark the graph, path and scoring functions"),
+    "report": ("metrics_report", True, "every metric of the detailed results in one report"),
+    "bootstrap": ("bootstrap_metrics", True, "bootstrap confidence intervals and paired tests"),
+    "transitions": ("answer_transitions", True, "outcome transitions between variants and runs, and id queries"),
+    "fa": ("fa_metrics", True, "adherence, resistance and incorrectness rates"),
+    "bias": ("bias_metrics", True, "prior and context biases"),
+    "path-fa": ("path_fa_metrics", True, "rates on the questions with a correct path"),
+    "pq-path-fa": ("pq_path_fa_metrics", True, "rates split by PQ correctness"),
+    "failure-attribution": ("failure_attribution", True, "errors attributed to paths and to answer generation"),
+    "genpaths": ("genpaths_metrics", True, "generated path statistics of GCR and RoG"),
+    "tog": ("tog_metrics", True, "ToG rates on the questions with a path"),
+    "tog-genpaths": ("tog_genpaths_metrics", True, "ToG generated path statistics"),
+}
+
+# Commands whose module has a main(argv) entry point, which is called instead of running the module as a script:
+# their worker pools refer to the module by name, so under the spawn start method (macOS, Windows) the workers
+# could not find the functions of a module run as __main__ by runpy
+MAIN_COMMANDS = {"detail", "pipeline", "dataset-metrics", "bootstrap", "transitions"}
+
+# Commands run by "reports", in this order: the single-metric scripts, which read the same detailed files
+REPORTS = ["fa", "bias", "path-fa", "pq-path-fa", "failure-attribution", "genpaths", "tog", "tog-genpaths"]
+
+def run_command(name, args):
+    """
+    Run a command with the given arguments: call main(args) of its module if it has one (MAIN_COMMANDS),
+    otherwise run its script as "python -m {module} args" would.
+    The detailed tables it loads are kept in memory for the next commands of the process.
+    Return the exit status of the command.
+    """
+    module, uses_tables, _ = COMMANDS[name]
+    if uses_tables:
+        from detailed_table import start_session
+        start_session()
+    saved_argv = sys.argv
+    sys.argv = [f"{module}.py"] + list(args)
+    try:
+        if name in MAIN_COMMANDS:
+            return importlib.import_module(module).main(list(args)) or 0
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code)
+        return 1
+    finally:
+        sys.argv = saved_argv
+    return 0
+
+def run_reports(args):
+    status = 0
+    for name in REPORTS:
+        print(f"== {name} ==")
+        status = run_command(name, args) or status
+        print()
+    return status
+
+def dispatch(argv):
+    """
+    Run a command line (without the program name) and return its exit status.
+    """
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    name, args = argv[0], argv[1:]
+    if name == "reports":
+        return run_reports(args)
+    if name == "shell":
+        return shell()
+    if name not in COMMANDS:
+        print(f"Unknown command {name!r}\n{usage()}")
+        return 2
+    return run_command(name, args)
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: python cli.py COMMAND [ARGS...]   (python cli.py COMMAND --help for the arguments of a command)", "",
+             "commands:"]
+    lines += [f"  {name:<{width}}  {description}" for name, (_, _, description) in COMMANDS.items()]
+    lines += [f"  {'reports':<{width}}  run {', '.join(REPORTS)} in one process, loading each detailed file once",
+              f"  {'shell':<{width}}  interactive session keeping the loaded detailed tables in memory across commands"]
+    return "\n".join(lines)
+
+def shell():
+    """
+    Read commands until "exit" or end of input, keeping the detailed tables loaded by a command for the next ones;
+    a table is read again only when its file changed. "tables" lists them and "clear" drops them.
+    """
+    from detailed_table import start_session, clear_session, session_tables
+    start_session()
+    print('Session started: type a command as for "python cli.py", "help", "tables", "clear" or "exit".')
+    while True:
+        try:
+            line = input("> ")
+        except EOFError:
+            print()
+            return 0
+        except KeyboardInterrupt:
+            print()
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"Error: {e}")
+            continue
+        if not argv:
+            continue
+        if argv[0] in ("exit", "quit"):
+            return 0
+        if argv[0] == "shell":
+            print("Already in a session.")
+        elif argv[0] == "tables":
+            for path, n_rows in session_tables().items():
+                print(f"{path}: {n_rows} rows")
+        elif argv[0] == "clear":
+            clear_session()
+        else:
+            start = perf_counter()
+            try:
+                status = dispatch(argv)
+            except KeyboardInterrupt:
+                print("\nInterrupted.")
+                continue
+            except Exception as e:
+                print(f"Error: {e!r}")
+                continue
+            print(f"[{'done' if not status else f'exit status {status}'} in {perf_counter() - start:.2f}s]")
+
+if __name__ == "__main__":
+    sys.exit(dispatch(sys.argv[1:]))
@@ -0,0 +1,172 @@
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import count
+
+class CompactGraph:
+    """
+    Compact, read-only graph built directly from a list of [head, relation, tail] triplets.
+    Entities and relations are interned to integer ids. Adjacency is stored CSR-style:
+    the neighbors of node u are neighbors[offsets[u]:offsets[u + 1]], sorted by id.
+    Each adjacency slot owns a sorted, duplicate-free run of relation ids
+    (rel_ids[rel_offsets[slot]:rel_offsets[slot + 1]]), i.e. the relation set of that edge.
+    """
+
+    __slots__ = ("nodes", "relations", "node_ids", "relation_ids",
+                 "offsets", "neighbors", "rel_offsets", "rel_ids",
+                 "undirected", "n_edges")
+
+    def __init__(self, nodes, relations, offsets, neighbors, rel_offsets, rel_ids, undirected, n_edges,
+                 node_ids=None, relation_ids=None):
+        self.nodes = nodes
+        self.relations = relations
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.rel_offsets = rel_offsets
+        self.rel_ids = rel_ids
+        self.undirected = undirected
+        self.n_edges = n_edges
+        self.node_ids = node_ids if node_ids is not None else {name: i for i, name in enumerate(nodes)}
+        self.relation_ids = relation_ids if relation_ids is not None else {name: i for i, name in enumerate(relations)}
+
+    def __contains__(self, name):
+        return name in self.node_ids
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return self.n_edges
+
+    def node_id(self, name):
+        """
+        Return the integer id of an entity, or None if the entity is not in the graph.
+        """
+        return self.node_ids.get(name)
+
+    def relation_id(self, name):
+        """
+        Return the integer id of a relation, or None if the relation never occurs in the graph.
+        """
+        return self.relation_ids.get(name)
+
+    def find_edge(self, u, v):
+        """
+        Return the adjacency slot of the edge u -> v, or -1 if there is no such edge.
+        """
+        lo, hi = self.offsets[u], self.offsets[u + 1]
+        slot = bisect_left(self.neighbors, v, lo, hi)
+        if slot < hi and self.neighbors[slot] == v:
+            return slot
+        return -1
+
+    def slot_has_relation(self, slot, relation):
+        """
+        Check if the edge stored in the given adjacency slot carries the given relation id.
+        """
+        lo, hi = self.rel_offsets[slot], self.rel_offsets[slot + 1]
+        i = bisect_left(self.rel_ids, relation, lo, hi)
+        return i < hi and self.rel_ids[i] == relation
+
+    def has_edge_relation(self, u, v, relation):
+        """
+        Check if the edge u -> v exists and carries the given relation id.
+        """
+        slot = self.find_edge(u, v)
+        return slot >= 0 and self.slot_has_relation(slot, relation)
+
+    def edge_relations(self, u, v):
+        """
+        Return the relation names of the edge u -> v (empty list if there is no such edge).
+        """
+        slot = self.find_edge(u, v)
+        if slot < 0:
+            return []
+        return [self.relations[r] for r in self.rel_ids[self.rel_offsets[slot]:self.rel_offsets[slot + 1]]]
+
+    def neighbors_by_relation(self, u, relation):
+        """
+        Yield the ids of the neighbors of u reachable through an edge carrying the given relation id.
+        """
+        neighbors, rel_offsets, rel_ids = self.neighbors, self.rel_offsets, self.rel_ids
+        for slot in range(self.offsets[u], self.offsets[u + 1]):
+            if relation in rel_ids[rel_offsets[slot]:rel_offsets[slot + 1]]:
+                yield neighbors[slot]
+
+    def hop_distances(self, sources, targets):
+        """
+        Return the number of hops from the nearest source entity to each target entity, in the order of targets,
+        or None for a target that is unreachable or not in the graph. The multi-source search expands
+        one frontier of node ids per hop and stops as soon as every target is reached.
+        """
+        target_ids = [self.node_ids.get(name) for name in targets]
+        remaining = set(target_ids)
+        remaining.discard(None)
+        frontier = {self.node_ids[name] for name in sources if name in self.node_ids}
+        seen = bytearray(len(self.nodes))
+        for u in frontier:
+            seen[u] = 1
+        offsets, neighbors = self.offsets, self.neighbors
+        distances = {}
+        depth = 0
+        while frontier and remaining:
+            for u in frontier & remaining:
+                distances[u] = depth
+            remaining -= frontier
+            next_frontier = set()
+            if remaining:
+                for u in frontier:
+                    for v in neighbors[offsets[u]:offsets[u + 1]]:
+                        if not seen[v]:
+                            seen[v] = 1
+                            next_frontier.add(v)
+            frontier = next_frontier
+            depth += 1
+        return [distances.get(i) for i in target_ids]
+
+def build_compact_graph(graph: list, undirected = False) -> CompactGraph:
+    """
+    Build a CompactGraph from a list of triplets. Each triplet is expected to be in the form [head, relation, tail].
+    Names are stripped as in utils.build_graph, so the two graphs have the same nodes, edges and relations.
+    With undirected=True, h -> t and t -> h share one relation set, as a single edge of a networkx Graph does.
+    """
+    node_ids = defaultdict(count().__next__)
+    relation_ids = defaultdict(count().__next__)
+    keys = set()
+    for h, r, t in graph:
+        u = node_ids[h.strip()]
+        v = node_ids[t.strip()]
+        rel = relation_ids[r.strip()]
+        keys.add((u, v, rel))
+        if undirected:
+            keys.add((v, u, rel))
+
+    # Sorted (u, v, relation) keys give neighbors sorted by id and duplicate-free relation runs
+    nodes = list(node_ids)
+    relations = list(relation_ids)
+    offsets = array('q', bytes(8 * (len(nodes) + 1)))
+    neighbors = array('q')
+    rel_offsets = array('q', [0])
+    rel_ids = array('q')
+    self_loops = 0
+    prev_u, prev_v = -1, -1
+    for u, v, rel in sorted(keys):
+        if v != prev_v or u != prev_u:
+            if prev_u >= 0:
+                rel_offsets.append(len(rel_ids))
+            offsets[u + 1] += 1
+            neighbors.append(v)
+            self_loops += u == v
+            prev_u, prev_v = u, v
+        rel_ids.append(rel)
+    if neighbors:
+        rel_offsets.append(len(rel_ids))
+    for i in range(len(nodes)):
+        offsets[i + 1] += offsets[i]
+    # An undirected edge fills two slots, except for self-loops
+    n_edges = (len(neighbors) + self_loops) // 2 if undirected else len(neighbors)
+
+    node_ids.default_factory = None
+    relation_ids.default_factory = None
+    return CompactGraph(nodes, relations, offsets, neighbors, rel_offsets, rel_ids, undirected, n_edges,
+                        node_ids=node_ids, relation_ids=relation_ids)
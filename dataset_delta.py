@@ -0,0 +1,183 @@
+from jsonl_index import JsonlFile, index_path_for
+import argparse
+import json
+import os
+from difflib import SequenceMatcher
+
+# An altered dataset can be stored as {name}.delta.jsonl: one delta record per question-item, holding only
+# what differs from the item with the same id in a base dataset file of the same directory (the original one):
+#   "delta_of": file name of the base dataset,
+#   "graph": the triplets as a list of operations, either [start, end] to copy base_graph[start:end]
+#            or a list of new [head, relation, tail] triplets (absent if the graph is stored in "set"),
+#   "set": the other fields whose value differs from the base item, "unset": the base fields missing from the item,
+#   "order": the field order of the item, only when it differs from the order given by the base item.
+# Items without a counterpart in the base are stored whole, as plain question-items.
+DELTA_SUFFIX = ".delta.jsonl"
+
+def delta_path_for(path):
+    """
+    Return the path of the delta file of a dataset JSONL file.
+    """
+    root, _ = os.path.splitext(path)
+    return root + DELTA_SUFFIX
+
+def dataset_source(directory, variant):
+    """
+    Return the path to read a dataset variant from: its JSONL file if present, otherwise its delta file if present.
+    """
+    path = os.path.join(directory, f"webqsp-{variant}.jsonl")
+    if not os.path.exists(path) and os.path.exists(delta_path_for(path)):
+        return delta_path_for(path)
+    return path
+
+def is_delta(record) -> bool:
+    return "delta_of" in record
+
+def diff_graph(base_graph, graph):
+    """
+    Encode graph as operations over base_graph: [start, end] ranges of base triplets and lists of new triplets.
+    """
+    matcher = SequenceMatcher(None, [tuple(t) for t in base_graph], [tuple(t) for t in graph], autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(graph[j1:j2])
+    return ops
+
+def diff_item(base, item, base_name) -> dict:
+    """
+    Return the delta record of a question-item against the base item with the same id.
+    """
+    delta = {"id": item["id"], "delta_of": base_name}
+    fields = {}
+    if isinstance(base.get("graph"), list) and isinstance(item.get("graph"), list):
+        delta["graph"] = diff_graph(base["graph"], item["graph"])
+    elif "graph" in item:
+        fields["graph"] = item["graph"]
+    missing = object()
+    for key, value in item.items():
+        if key != "graph" and base.get(key, missing) != value:
+            fields[key] = value
+    delta["set"] = fields
+    delta["unset"] = [key for key in base if key not in item]
+    if list(apply_delta(base, delta)) != list(item):
+        delta["order"] = list(item)
+    return delta
+
+def apply_delta(base, delta) -> dict:
+    """
+    Rebuild a question-item from its base item and its delta record.
+    The triplets copied from the base graph are shared with it, not copied.
+    """
+    unset = set(delta.get("unset", ()))
+    item = {key: value for key, value in base.items() if key not in unset}
+    if "graph" in delta:
+        base_graph = base["graph"]
+        graph = []
+        for op in delta["graph"]:
+            if op and isinstance(op[0], int):
+                graph.extend(base_graph[op[0]:op[1]])
+            else:
+                graph.extend(op)
+        item["graph"] = graph
+    item.update(delta.get("set", {}))
+    if "order" in delta:
+        item = {key: item[key] for key in delta["order"]}
+    return item
+
+class DeltaResolver:
+    """
+    Rebuild the question-items of delta files, reading their base items by id from the base files,
+    which are opened on first use from the directory of the delta file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.bases = {}
+
+    def base(self, name) -> JsonlFile:
+        if name not in self.bases:
+            self.bases[name] = JsonlFile(os.path.join(self.directory, name))
+        return self.bases[name]
+
+    def resolve(self, record) -> dict:
+        """
+        Return the question-item of a record, applying it to its base item if it is a delta.
+        """
+        if not is_delta(record):
+            return record
+        return apply_delta(self.base(record["delta_of"]).record(record["id"]), record)
+
+    def close(self):
+        for base in self.bases.values():
+            base.close()
+
+def iter_dataset_items(path):
+    """
+    Stream the question-items of a dataset JSONL or delta file, one parsed line at a time.
+    """
+    resolver = DeltaResolver(os.path.dirname(path))
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if line:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"Error in line {line_number}: {e}")
+                        continue
+                    yield resolver.resolve(record)
+    finally:
+        resolver.close()
+
+def convert_variant(variant, directory="datasets"):
+    """
+    Write the delta file of a dataset variant against the original dataset, checking that every item is rebuilt exactly.
+    Return the sizes in bytes of the variant JSONL file and of its delta file.
+    """
+    path = os.path.join(directory, f"webqsp-{variant}.jsonl")
+    base_name = "webqsp-original.jsonl"
+    base = JsonlFile(os.path.join(directory, base_name))
+    tmp_path = delta_path_for(path) + ".tmp"
+    with open(path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as out:
+        for line_number, line in enumerate(src, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if item.get("id") in base:
+                base_item = base.record(item["id"])
+                record = diff_item(base_item, item, base_name)
+                rebuilt = apply_delta(base_item, record)
+            else:
+                record = rebuilt = item
+            if json.dumps(rebuilt, ensure_ascii=False) != json.dumps(item, ensure_ascii=False):
+                raise ValueError(f"Line {line_number} of {path} is not rebuilt exactly from its delta")
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    base.close()
+    os.replace(tmp_path, delta_path_for(path))
+    return os.path.getsize(path), os.path.getsize(delta_path_for(path))
+
+def main(variants, directory="datasets", remove=False):
+    for variant in variants:
+        full_size, delta_size = convert_variant(variant, directory)
+        print(f"Dataset: {variant} - {full_size} bytes -> {delta_size} bytes ({delta_size / full_size:.1%})")
+        if remove:
+            path = os.path.join(directory, f"webqsp-{variant}.jsonl")
+            os.remove(path)
+            # The sidecar index of the removed file would be stale if a file of the same name came back
+            if os.path.exists(index_path_for(path)):
+                os.remove(index_path_for(path))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the altered datasets to delta files against the original dataset.")
+    parser.add_argument("--variants", nargs="+", default=["slight", "significant", "comical", "uncomp"],
+                        help="dataset variants to convert (default: the four altered ones)")
+    parser.add_argument("--dir", default="datasets", help="directory of the datasets (default: datasets)")
+    parser.add_argument("--remove", action="store_true",
+                        help="delete the JSONL file of each variant, and its sidecar index, once its delta file is written and checked")
+    args = parser.parse_args()
+    main(args.variants, directory=args.dir, remove=args.remove)
@@ -1,6 +1,21 @@
-from utils import read_jsonl, build_graph
+from graph_store import open_graph_store
+from dataset_delta import dataset_source, iter_dataset_items
+from utils import chunked
+import argparse
+import json
+import math
+import os
 import statistics
+import sys
+from array import array
 from collections import Counter
+from multiprocessing import Pool
+import numpy as np
+
+# A node is a hub of its question subgraph if its degree is at least HUB_MIN_DEGREE
+# and HUB_Z standard deviations above the mean degree of the subgraph
+HUB_MIN_DEGREE = 10
+HUB_Z = 3.0
 
 def get_q_entity_count(item):
     """
@@ -22,27 +37,39 @@ def get_a_entity_count(item):
         return len(a_entities)
     return None
 
+def count_graph(item):
+    """
+    Store in 'n_nodes' and 'n_edges' the number of nodes and of directed edges of the graph of the question-item,
+    counted from its triplets with set operations (the same counts as a networkx DiGraph built by build_graph).
+    Items loaded from a graph store already carry the precomputed counts.
+    If the 'graph' field is missing or not a list, both counts are None.
+    """
+    if "n_nodes" in item:
+        return
+    graph_data = item.get("graph")
+    if isinstance(graph_data, list):
+        heads = [h.strip() for h, _, _ in graph_data]
+        tails = [t.strip() for _, _, t in graph_data]
+        item["n_nodes"] = len(set(heads).union(tails))
+        item["n_edges"] = len(set(zip(heads, tails)))
+    else:
+        item["n_nodes"], item["n_edges"] = None, None
+
 def get_node_count(item):
     """
     Return the number of nodes in the graph of the question-item.
     If the 'graph' field is missing or not a list, return None.
     """
-    graph_data = item.get("graph")
-    if isinstance(graph_data, list):
-        graph = build_graph(graph_data, undirected=False)
-        return graph.number_of_nodes()
-    return None
+    count_graph(item)
+    return item["n_nodes"]
 
 def get_edge_count(item):
     """
     Return the number of edges in the graph of the question-item.
     If the 'graph' field is missing or not a list, return None.
     """
-    graph_data = item.get("graph")
-    if isinstance(graph_data, list):
-        graph = build_graph(graph_data, undirected=False)
-        return graph.number_of_edges()
-    return None
+    count_graph(item)
+    return item["n_edges"]
 
 def get_dataset_type(item):
     """
@@ -50,86 +77,335 @@ def get_dataset_type(item):
     """
     return [item.get("dataset")]
 
-def get_stat_data_num(item_list, func):
+class NumericStat:
     """
-    Apply a function to each question-item and calculate statistics.
+    Accumulate the values returned by a function over the question-items.
     The function may return:
       - None  -> ignored
       - int   -> single value
-      - list[int] -> multiple values
+    Only one integer per question-item is kept, so memory does not depend on the size of the graphs.
     """
-    values = []
-    
-    for item in item_list:
-        result = func(item)
-        if result is None:
-            continue
-        elif isinstance(result, int):
-            values.append(result)
-        else:
-            continue
-
-    if not values:
-        print("No valid data available.")
-        return
-    
-    mean_val = statistics.mean(values)
-    median_val = statistics.median(values)
-    
-    print("Total sum:", sum(values))
-    print("Mean:", mean_val)
-    print("Median:", median_val)
 
-def get_stat_data_cat(item_list, func):
+    def __init__(self, func):
+        self.func = func
+        self.values = array('q')
+
+    def add(self, item):
+        result = self.func(item)
+        if isinstance(result, int):
+            self.values.append(result)
+
+    def percentile(self, sorted_values, p):
+        """
+        Return the p-th percentile of the sorted values, interpolating linearly between the closest ranks.
+        """
+        position = (len(sorted_values) - 1) * p / 100
+        lower = math.floor(position)
+        upper = min(lower + 1, len(sorted_values) - 1)
+        return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+    def histogram(self, sorted_values, n_bins):
+        """
+        Return the (low, high, count) bins of an equal-width histogram of the integer values.
+        """
+        low, high = sorted_values[0], sorted_values[-1]
+        width = max(1, math.ceil((high - low + 1) / n_bins))
+        counts = Counter((value - low) // width for value in sorted_values)
+        return [(low + i * width, low + (i + 1) * width, counts.get(i, 0)) for i in range((high - low) // width + 1)]
+
+    def report(self, percentiles=(5, 25, 50, 75, 95, 99), n_bins=10):
+        if not self.values:
+            print("No valid data available.")
+            return
+
+        print("Total sum:", sum(self.values))
+        print("Mean:", statistics.mean(self.values))
+        print("Median:", statistics.median(self.values))
+        sorted_values = sorted(self.values)
+        print("Min:", sorted_values[0], "Max:", sorted_values[-1])
+        print("Percentiles:", ", ".join(f"p{p}: {self.percentile(sorted_values, p):g}" for p in percentiles))
+        print("Histogram:")
+        for low, high, count in self.histogram(sorted_values, n_bins):
+            print(f"  [{low}, {high}): {count}")
+
+class CategoricalStat:
     """
-    Apply a function to each question-item and calculate categorical statistics.
+    Accumulate the categories returned by a function over the question-items.
     The function may return:
       - None       -> ignored
       - str        -> single category
       - list[str]  -> multiple categories
     """
-    values = []
 
-    for item in item_list:
-        result = func(item)
-        if result is None:
-            continue
-        elif isinstance(result, str):
-            values.append(result)
+    def __init__(self, func):
+        self.func = func
+        self.distribution = Counter()
+
+    def add(self, item):
+        result = self.func(item)
+        if isinstance(result, str):
+            self.distribution[result] += 1
         elif isinstance(result, list):
-            values.extend([x for x in result if isinstance(x, str)])
-        else:
-            continue
+            self.distribution.update(x for x in result if isinstance(x, str))
 
-    if not values:
-        print("No valid categorical data available.")
-        return
-    
-    distribution = Counter(values)
-    
-    print("Total count:", len(values))
-    print("Distribution:")
-    for val, count in distribution.most_common(10): 
-        print(f"  {val}: {count}")
-
-def main():
-    path = "datasets/webqsp-original.jsonl"
-    item_list = read_jsonl(path)
-
-    print("Number of questions:", len(item_list))
-
-    print("Answer count statistics:")
-    get_stat_data_num(item_list, get_a_entity_count)
-    print("\nQuestion entity count statistics:")
-    get_stat_data_num(item_list, get_q_entity_count)
-    print("\nNode count statistics:")
-    get_stat_data_num(item_list, get_node_count)
-    print("\nEdge count statistics:")
-    get_stat_data_num(item_list, get_edge_count)
-    print("\nDataset type statistics:")
-    get_stat_data_cat(item_list, get_dataset_type)
+    def report(self, top=10):
+        total = sum(self.distribution.values())
+        if not total:
+            print("No valid categorical data available.")
+            return
 
-if __name__ == "__main__":
-    main()
+        print("Total count:", total)
+        print("Distribution:")
+        for val, count in self.distribution.most_common(top): 
+            print(f"  {val}: {count}")
+
+def get_stat_data_num(item_list, func):
+    """
+    Apply a function to each question-item and calculate statistics.
+    """
+    stat = NumericStat(func)
+    for item in item_list:
+        stat.add(item)
+    stat.report()
 
-    
\ No newline at end of file
+def get_stat_data_cat(item_list, func):
+    """
+    Apply a function to each question-item and calculate categorical statistics.
+    """
+    stat = CategoricalStat(func)
+    for item in item_list:
+        stat.add(item)
+    stat.report()
+
+def compute_statistics(items):
+    """
+    Compute all the numeric and categorical statistics in a single pass over the question-items.
+    The items can be a stream: each one is processed once and then discarded.
+    Return the number of question-items and the accumulated statistics, in report order.
+    """
+    stats = {
+        "Answer count statistics": NumericStat(get_a_entity_count),
+        "Question entity count statistics": NumericStat(get_q_entity_count),
+        "Node count statistics": NumericStat(get_node_count),
+        "Edge count statistics": NumericStat(get_edge_count),
+        "Dataset type statistics": CategoricalStat(get_dataset_type),
+    }
+    n_items = 0
+    for item in items:
+        n_items += 1
+        for stat in stats.values():
+            stat.add(item)
+    return n_items, stats
+
+def iter_store_items(path):
+    """
+    Stream the question-items of a dataset from its graph store, with their node and edge counts instead of their graph.
+    """
+    store = open_graph_store(path)
+    try:
+        for question_id in store.ids:
+            item = store.item(question_id)
+            item["n_nodes"], item["n_edges"] = store.counts(question_id)
+            yield item
+    finally:
+        store.close()
+
+def intern_triplets(triplets):
+    """
+    Intern the names of a list of [head, relation, tail] triplets, stripped as in build_compact_graph.
+    Return the (n, 3) int32 array of (head, relation, tail) ids, the {name: id} of the nodes and the relation names.
+    """
+    node_ids, relation_ids = {}, {}
+    ids = [(node_ids.setdefault(h.strip(), len(node_ids)), relation_ids.setdefault(r.strip(), len(relation_ids)),
+            node_ids.setdefault(t.strip(), len(node_ids))) for h, r, t in triplets]
+    return np.array(ids, dtype=np.int32).reshape(-1, 3), node_ids, list(relation_ids)
+
+def undirected_edges(triples, n_nodes):
+    """
+    Return the (source, target) arrays of the distinct undirected edges of the triples, in both directions
+    (a self-loop once), and the degree of each node, i.e. its number of distinct neighbors.
+    """
+    heads, tails = triples[:, 0].astype(np.int64), triples[:, 2].astype(np.int64)
+    pairs = np.unique(np.minimum(heads, tails) * n_nodes + np.maximum(heads, tails))
+    low, high = pairs // n_nodes, pairs % n_nodes
+    loops = low == high
+    sources = np.concatenate([low, high[~loops]])
+    targets = np.concatenate([high, low[~loops]])
+    return sources, targets, np.bincount(sources, minlength=n_nodes)
+
+def bfs_levels(sources, targets, n_nodes, start):
+    """
+    Expand a breadth-first search from the start node ids one whole frontier at a time over the edge arrays.
+    Return the hop distance of every node (-1 if unreachable).
+    """
+    distances = np.full(n_nodes, -1, dtype=np.int64)
+    frontier = np.zeros(n_nodes, dtype=bool)
+    frontier[start] = True
+    depth = 0
+    while frontier.any():
+        distances[frontier] = depth
+        reached = np.zeros(n_nodes, dtype=bool)
+        reached[targets[frontier[sources]]] = True
+        frontier = reached & (distances < 0)
+        depth += 1
+    return distances
+
+def question_topology(triples, node_ids, relations, q_entity, top_relations=3):
+    """
+    Compute the topology statistics of a question subgraph from its interned (n, 3) triples: degree distribution,
+    relation-type counts, hubs around the question entities, and the eccentricity of the question entities
+    with a double-sweep estimate of the diameter (a lower bound, exact on trees). node_ids maps the node names to their ids.
+    """
+    n_nodes = len(node_ids)
+    q_ids = [i for i in (node_ids.get(e) for e in q_entity or []) if i is not None]
+    stats = {"n_triples": len(triples), "n_relation_types": 0, "top_relations": [],
+             "degree_mean": None, "degree_median": None, "degree_max": None, "degree_log2_histogram": [],
+             "n_hubs": 0, "q_entity_degrees": [], "q_entity_hubs": [], "q_hub_neighbors": 0,
+             "q_eccentricity": None, "q_reachable_nodes": 0, "diameter_estimate": None}
+    if not n_nodes:
+        return stats
+    relation_counts = np.bincount(triples[:, 1], minlength=len(relations))
+    order = np.argsort(-relation_counts, kind="stable")[:top_relations]
+    stats["n_relation_types"] = int(np.count_nonzero(relation_counts))
+    stats["top_relations"] = [[relations[i], int(relation_counts[i])] for i in order if relation_counts[i]]
+
+    sources, targets, degrees = undirected_edges(triples, n_nodes)
+    stats["degree_mean"] = round(float(degrees.mean()), 4)
+    stats["degree_median"] = float(np.median(degrees))
+    stats["degree_max"] = int(degrees.max())
+    # Number of nodes with degree in [1, 2), [2, 4), [4, 8), ...
+    stats["degree_log2_histogram"] = np.bincount(np.log2(degrees[degrees > 0]).astype(np.int64)).tolist()
+    hubs = (degrees >= HUB_MIN_DEGREE) & (degrees >= degrees.mean() + HUB_Z * degrees.std())
+    stats["n_hubs"] = int(np.count_nonzero(hubs))
+    if not q_ids:
+        return stats
+    stats["q_entity_degrees"] = degrees[q_ids].tolist()
+    stats["q_entity_hubs"] = hubs[q_ids].tolist()
+    q_mask = np.zeros(n_nodes, dtype=bool)
+    q_mask[q_ids] = True
+    neighbors = np.zeros(n_nodes, dtype=bool)
+    neighbors[targets[q_mask[sources]]] = True
+    stats["q_hub_neighbors"] = int(np.count_nonzero(neighbors & hubs & ~q_mask))
+
+    distances = bfs_levels(sources, targets, n_nodes, q_ids)
+    stats["q_eccentricity"] = int(distances.max())
+    stats["q_reachable_nodes"] = int(np.count_nonzero(distances >= 0))
+    # Double sweep: the eccentricity of a node farthest from the question entities bounds the diameter from below
+    farthest = int(np.argmax(distances))
+    stats["diameter_estimate"] = max(int(bfs_levels(sources, targets, n_nodes, [farthest]).max()), stats["q_eccentricity"])
+    return stats
+
+# Graph store of the variant processed by the worker processes, opened by _open_topology_store
+_topology_store = None
+
+def _open_topology_store(path):
+    global _topology_store
+    _topology_store = open_graph_store(path)
+
+def store_topology(question_ids):
+    """
+    Compute the topology statistics of a chunk of questions read from the graph store of the worker process.
+    The triples are zero-copy views of the mapped store.
+    """
+    rows = []
+    for question_id in question_ids:
+        item = _topology_store.item(question_id)
+        graph = _topology_store.graph(question_id)
+        triples = np.frombuffer(_topology_store.triples(question_id), dtype=np.int32).reshape(-1, 3)
+        rows.append(dict(id=question_id, **question_topology(triples, graph.node_ids, graph.relations, item.get("q_entity"))))
+    return rows
+
+def items_topology(items):
+    """
+    Compute the topology statistics of a chunk of question-items, interning the triplets of their graphs.
+    """
+    rows = []
+    for item in items:
+        triples, node_ids, relations = intern_triplets(item.get("graph") or [])
+        rows.append(dict(id=item["id"], **question_topology(triples, node_ids, relations, item.get("q_entity"))))
+    return rows
+
+def compute_topology(path, use_store=True, workers=1, chunk_size=64):
+    """
+    Compute the topology statistics of every question of a dataset file, in file order,
+    spreading chunks of questions over a pool of worker processes if workers > 1.
+    """
+    if use_store:
+        store = open_graph_store(path)
+        chunks = list(chunked(store.ids, chunk_size))
+        store.close()
+        func, initializer, initargs = store_topology, _open_topology_store, (path,)
+    else:
+        chunks = chunked(iter_dataset_items(path), chunk_size)
+        func, initializer, initargs = items_topology, None, ()
+    if workers > 1:
+        with Pool(workers, initializer=initializer, initargs=initargs) as pool:
+            return [row for rows in pool.imap(func, chunks) for row in rows]
+    if initializer is not None:
+        initializer(*initargs)
+    return [row for rows in map(func, chunks) for row in rows]
+
+def write_question_stats(topology, stats_path):
+    """
+    Write the topology statistics of the variants as one row per question id, with the fields of each variant
+    prefixed by its name as in the results_detailed files, so that the two can be joined by id.
+    """
+    rows = {}
+    for variant, variant_rows in topology.items():
+        for row in variant_rows:
+            joined = rows.setdefault(row["id"], {"id": row["id"]})
+            joined.update((f"{variant}_{key}", value) for key, value in row.items() if key != "id")
+    os.makedirs(os.path.dirname(stats_path) or ".", exist_ok=True)
+    with open(stats_path + ".tmp", "w", encoding="utf-8") as f:
+        for row in rows.values():
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(stats_path + ".tmp", stats_path)
+
+def report_datasets(variants=("original",), use_store=True, n_bins=10, stats_path=None, workers=1):
+    topology = {}
+    for variant in variants:
+        path = dataset_source("datasets", variant)
+        items = iter_store_items(path) if use_store else iter_dataset_items(path)
+        n_items, stats = compute_statistics(items)
+        if stats_path:
+            topology[variant] = compute_topology(path, use_store=use_store, workers=workers)
+            for title, field in (("Maximum degree statistics", "degree_max"), ("Hub count statistics", "n_hubs"),
+                                 ("Relation type count statistics", "n_relation_types"),
+                                 ("Question entity eccentricity statistics", "q_eccentricity"),
+                                 ("Diameter estimate statistics", "diameter_estimate")):
+                stat = stats[title] = NumericStat(lambda row, field=field: row[field])
+                for row in topology[variant]:
+                    stat.add(row)
+
+        print(f"Dataset: {variant}")
+        print("Number of questions:", n_items)
+        for i, (title, stat) in enumerate(stats.items()):
+            print(f"{'' if i == 0 else chr(10)}{title}:")
+            if isinstance(stat, NumericStat):
+                stat.report(n_bins=n_bins)
+            else:
+                stat.report()
+        print()
+    if stats_path:
+        write_question_stats(topology, stats_path)
+        print(f"Per-question topology statistics written to {stats_path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute statistics of the WebQSP datasets.")
+    parser.add_argument("--variants", nargs="+", default=["original", "slight", "significant", "comical", "uncomp"],
+                        help="dataset variants to analyze (default: all five)")
+    parser.add_argument("--bins", type=int, default=10, help="number of histogram bins (default: 10)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="stream the dataset JSONL files instead of reading their precompiled graph stores")
+    parser.add_argument("--topology", nargs="?", const="reports/question-stats.jsonl", default=None,
+                        help="also compute the topology statistics of every question subgraph and write them per question id "
+                             "(default path: reports/question-stats.jsonl)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes computing the topology statistics (default: 1)")
+    args = parser.parse_args(argv)
+    report_datasets(variants=args.variants, use_store=not args.no_store, n_bins=args.bins, stats_path=args.topology,
+                    workers=args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
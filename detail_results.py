@@ -1,52 +1,72 @@
-from utils import write_jsonl, check_answer_match, analyze_prediction, is_path_correct, is_path_existing, build_graph
+from utils import (AnswerSet, normalize_answer, classify_predictions, paths_correctness, build_compact_graph, tog_paths_existence,
+                   is_tog_path_correct, chunked, JsonlWriter, PATH_EXISTS, PATH_BUDGET_EXCEEDED, FUZZY_THRESHOLD)
+from path_trie import validate_paths
+from graph_store import open_graph_store
+from result_cache import ResultCache, cache_key, line_digest
+from jsonl_index import JsonlFile
+from dataset_delta import dataset_source, is_delta, apply_delta
+from run_trace import RunTrace, timed
+import argparse
 import json
+from collections import deque
 from contextlib import ExitStack
+from functools import partial
+from multiprocessing import Pool
+from time import perf_counter
+import os
+import sys
 
-def analyze_predictions(predictions, answer_original, answer_modified):
+def analyze_predictions(predictions, answer_original, answer_modified, fuzzy=None):
     """
     For a list of predictions, categorize each prediction as adherent, resistant, or incorrect,
     and return the count for each category.
+    The answers, given as lists or AnswerSets, are compiled once for the whole batch of predictions.
+    If fuzzy is given, the predictions matching no answer are matched by fuzzy similarity (see utils.analyze_prediction).
     """
-    adherence_count = 0  
-    resistance_count = 0  
-    incorrectness_count = 0  
-
-    for prediction in predictions:
-        category = analyze_prediction(prediction, answer_original, answer_modified)
-        if category == "ADH":
-            adherence_count += 1
-        elif category == "RES":
-            resistance_count += 1
-        else:
-            incorrectness_count += 1
-
-    return adherence_count, resistance_count, incorrectness_count
+    return classify_predictions(predictions, answer_original, answer_modified, fuzzy=fuzzy)
 
 def jsonl_iter(path):
     with open(path, "r", encoding="utf-8") as f:
         for line in f:
             yield json.loads(line)
 
-def process_item(pq, datasets_dict, results_dict, method):
+# Graph stores of the datasets, opened once per process by open_graph_stores
+_graph_stores = {}
+
+DATASETS = ['original', 'slight', 'significant', 'comical', 'uncomp']
+
+def process_item(pq, datasets_dict, results_dict, method, rog_budget=None, graphs=None, variants=None, trace=None,
+                 fuzzy=None):
     """
     For each question-item, compute adherence, resistance, and incorrectness counts for the PQ method and for each dataset, 
     as well as path correctness and existence counts for each dataset.
-    For ToG, path correctness is set to 0 and path existence is set to the total number of generated paths.
+    For ToG, a reasoning path exists if all its triplets are edges of the dataset graph, and it is correct
+    if it follows one of the ground paths of the results record (an empty list if the record has none).
+    For every method, {dataset}_original_answer_hops and {dataset}_modified_answer_hops hold the hop distance
+    from the question entities to each original and modified answer entity on the dataset graph (None if unreachable).
+    If rog_budget is given, each RoG path search visits at most that many nodes, and the paths whose search
+    ran out of budget are counted in an additional {dataset}_path_budget_exceeded field.
+    If graphs is given, it maps each dataset to the precompiled CompactGraph of the question,
+    otherwise the graphs are built from the 'graph' field of the question-items.
+    If variants is given, only the fields of those datasets are computed, along with the PQ fields.
+    If trace is given (a RunTrace), the time of each stage and the graph and search counts are added to it.
+    If fuzzy is given (a similarity threshold), the PQ predictions and the predictions of the datasets that match
+    no answer are also matched by fuzzy similarity, see utils.analyze_prediction.
     """
     
-    datasets = ['original', 'slight', 'significant', 'comical', 'uncomp']
+    datasets = DATASETS if variants is None else [d for d in DATASETS if d in variants]
 
     id = pq['id']
     n_answers = len(datasets_dict['original']['a_entity'])
     
-    strict_match = False
-    pq_n_pred = len(pq['prediction'])
-    pq_adh = 0
-    for pred in pq['prediction']:
-        for a_entity in datasets_dict['original']['a_entity']:
-            if check_answer_match(pred, a_entity, strict = strict_match):
-                pq_adh += 1
-                break
+    # A PQ prediction is adherent if it matches an answer entity non-strictly, i.e. as a substring, or fuzzily
+    with timed(trace, "answer_matching"):
+        a_entities = AnswerSet(datasets_dict['original']['a_entity'])
+        pq_n_pred = len(pq['prediction'])
+        pq_adh = 0
+        for pred in pq['prediction']:
+            pred = normalize_answer(pred)
+            pq_adh += a_entities.matches_substring(pred) or (fuzzy is not None and a_entities.fuzzy_score(pred) >= fuzzy)
     pq_inc = pq_n_pred - pq_adh
 
     result = {
@@ -58,13 +78,17 @@ def process_item(pq, datasets_dict, results_dict, method):
         "pq_inc": pq_inc,
     }
 
+    # The original answers are compiled once and shared by all the datasets
+    answer_original = AnswerSet(datasets_dict['original']['answer'])
     for dataset in datasets:
         result[f"{dataset}_n_pred"]= len(results_dict[dataset]['prediction'])
-        adh, res, inc = analyze_predictions(
-            results_dict[dataset]['prediction'],
-            datasets_dict['original']['answer'],
-            datasets_dict[dataset]['answer']
-        )
+        with timed(trace, "answer_matching"):
+            adh, res, inc = analyze_predictions(
+                results_dict[dataset]['prediction'],
+                answer_original,
+                datasets_dict[dataset]['answer'],
+                fuzzy=fuzzy
+            )
         result[f"{dataset}_adh"] = adh
         result[f"{dataset}_res"] = res
         result[f"{dataset}_inc"] = inc
@@ -73,53 +97,344 @@ def process_item(pq, datasets_dict, results_dict, method):
         path_correct = 0
         path_existing = 0
         q_entity = datasets_dict[dataset]['q_entity']
+        if graphs is not None:
+            G = graphs[dataset]
+        else:
+            with timed(trace, "build_graph"):
+                G = build_compact_graph(datasets_dict[dataset]['graph'], undirected=True)
         if method == "ToG":
-            result[f"{dataset}_path_existing"] = len(results_dict[dataset]['gen_paths'])
-            result[f"{dataset}_path_correct"] = 0
+            gen_paths = results_dict[dataset]['gen_paths']
+            ground_paths = results_dict[dataset].get('ground_paths', [])
+            with timed(trace, "tog_path_check"):
+                path_existing = sum(tog_paths_existence(gen_paths, G))
+                path_correct = sum(is_tog_path_correct(path, ground_paths) for path in gen_paths)
+            if trace is not None:
+                trace.count("paths_checked", len(gen_paths))
+            result[f"{dataset}_path_existing"] = path_existing
+            result[f"{dataset}_path_correct"] = path_correct
         else:
-            G = build_graph(datasets_dict[dataset]['graph'], undirected=True)
-            for path in results_dict[dataset]['gen_paths']:
-                if is_path_correct(path, results_dict[dataset]['ground_paths']):
-                    path_correct += 1
-                if is_path_existing(path, G, q_entity, method=method):
-                    path_existing += 1
+            with timed(trace, "path_correctness"):
+                path_correct = sum(paths_correctness(results_dict[dataset]['gen_paths'], results_dict[dataset]['ground_paths']))
+            with timed(trace, f"{method.lower()}_path_check"):
+                outcomes = validate_paths(results_dict[dataset]['gen_paths'], G, q_entity, method, budget=rog_budget,
+                                          stats=None if trace is None else trace.counters)
+            if trace is not None:
+                trace.count("graph_nodes", G.number_of_nodes())
+                trace.count("graph_edges", G.number_of_edges())
+                trace.count("paths_checked", len(outcomes))
+            path_existing = outcomes.count(PATH_EXISTS)
+            path_budget_exceeded = outcomes.count(PATH_BUDGET_EXCEEDED)
             result[f"{dataset}_path_correct"] = path_correct
             result[f"{dataset}_path_existing"] = path_existing
+            if method == "RoG" and rog_budget is not None:
+                result[f"{dataset}_path_budget_exceeded"] = path_budget_exceeded
+
+        # Hops from the question entities to the original and to the modified answer entities on this dataset's graph
+        with timed(trace, "answer_reachability"):
+            answer_original_entities = datasets_dict['original']['a_entity']
+            hops = G.hop_distances(q_entity, answer_original_entities + datasets_dict[dataset]['a_entity'])
+        result[f"{dataset}_original_answer_hops"] = hops[:len(answer_original_entities)]
+        result[f"{dataset}_modified_answer_hops"] = hops[len(answer_original_entities):]
 
     return result
 
-def main():
-    datasets_names = ["original", "slight", "significant", "comical", "uncomp"]
-    models = ["nano", "standard"]
-    methods = ["GCR", "RoG", "ToG"]
+def open_graph_stores(dataset_paths):
+    """
+    Open the graph stores of the datasets for the current process, compiling the missing or stale ones.
+    A store already open for a dataset is closed first, so that a process running many methods and models
+    (e.g. pipeline.py) keeps a single mapping per dataset.
+    """
+    for d, p in dataset_paths.items():
+        if d in _graph_stores:
+            _graph_stores.pop(d).close()
+        _graph_stores[d] = open_graph_store(p)
 
-    n_item_standard = 86
-    n_item_nano = 1462
+def close_graph_stores():
+    """
+    Close the graph stores opened in the current process.
+    """
+    for store in _graph_stores.values():
+        store.close()
+    _graph_stores.clear()
 
-    for method in methods:
-        for model in models:
-            print(f"Processing method '{method}' and model '{model}'...")
-            res_list = []
-            n_item = n_item_standard if model == "standard" else n_item_nano
+def read_bundles(dataset_paths, results_paths, pq_path, ground_paths=None):
+    """
+    Join the files by question id and yield, for each question of the results on the original dataset,
+    the raw JSON lines of the datasets, of the results, of the PQ method, and of the ground paths.
+    The lines are read through the sidecar byte-offset indexes of the files.
+    If dataset_paths is None, the datasets are read from the graph stores and their lines are None.
+    If ground_paths is given, it maps datasets to results files whose 'ground_paths' are used for the results
+    that have none (ToG); a question missing from one of them gets a None line. Otherwise the ground lines are None.
+    Questions missing from one of the other files are reported and skipped.
+    """
+    with ExitStack() as stack:
+        def open_indexed(path):
+            jsonl_file = JsonlFile(path)
+            stack.callback(jsonl_file.close)
+            return jsonl_file
 
-            dataset_paths = {d: f"datasets/webqsp-{d}.jsonl" for d in datasets_names}
-            results_paths = {d: f"results/{method}-{model}-{d}.jsonl" for d in datasets_names}
-            pq_path = f"results/pq-{model}-original.jsonl"
+        dataset_files = {d: open_indexed(p) for d, p in (dataset_paths or {}).items()}
+        results_files = {d: open_indexed(p) for d, p in results_paths.items()}
+        pq_file = open_indexed(pq_path)
+        ground_files = {d: open_indexed(p) for d, p in (ground_paths or {}).items()}
+        sources = list(dataset_files.values() if dataset_paths else _graph_stores.values())
+        sources += list(results_files.values()) + [pq_file]
 
-            with ExitStack() as stack:
-                dataset_files = {d: stack.enter_context(open(p, "r", encoding="utf-8")) for d, p in dataset_paths.items()}
-                results_files = {d: stack.enter_context(open(p, "r", encoding="utf-8")) for d, p in results_paths.items()}
-                pq_file = stack.enter_context(open(pq_path, "r", encoding="utf-8"))
+        missing = []
+        for question_id in results_files['original'].ids:
+            if not all(question_id in source for source in sources):
+                missing.append(question_id)
+                continue
+            dataset_lines = {d: f.line(question_id) for d, f in dataset_files.items()} if dataset_paths else None
+            results_lines = {d: f.line(question_id) for d, f in results_files.items()}
+            ground_lines = None
+            if ground_paths is not None:
+                ground_lines = {d: f.line(question_id) if question_id in f else None for d, f in ground_files.items()}
+            yield dataset_lines, results_lines, pq_file.line(question_id), ground_lines
+        if missing:
+            print(f"Skipped {len(missing)} questions missing from some input files: {', '.join(missing[:10])}"
+                  f"{', ...' if len(missing) > 10 else ''}")
 
-                for i in range(n_item):
-                    datasets_dict = {d: json.loads(dataset_files[d].readline()) for d in datasets_names}
-                    results_dict = {d: json.loads(results_files[d].readline()) for d in datasets_names}
-                    pq = json.loads(pq_file.readline())
+def process_bundle(bundle, method, rog_budget=None, variants=None, trace=None, fuzzy=None):
+    """
+    Parse the raw JSON lines of a question-item and process it.
+    Without dataset lines, the question-items and their graphs are loaded from the graph stores.
+    Dataset lines may be delta records against the original question-item (see dataset_delta).
+    Ground lines, if any, give the ground paths of the results records without them.
+    If variants is given, only the fields of those datasets are computed, along with the PQ fields.
+    """
+    dataset_lines, results_lines, pq_line, ground_lines = bundle
+    needed = DATASETS if variants is None else [d for d in DATASETS if d in variants]
+    with timed(trace, "parse_json"):
+        results_dict = {d: json.loads(results_lines[d]) for d in needed}
+        pq = json.loads(pq_line)
+        if ground_lines is not None:
+            for d in needed:
+                if 'ground_paths' not in results_dict[d]:
+                    line = ground_lines.get(d)
+                    results_dict[d]['ground_paths'] = json.loads(line).get('ground_paths', []) if line else []
+    graphs = None
+    if dataset_lines is None:
+        with timed(trace, "parse_json"):
+            datasets_dict = {d: _graph_stores[d].item(pq['id']) for d in set(needed) | {'original'}}
+        with timed(trace, "load_graph"):
+            graphs = {d: _graph_stores[d].graph(pq['id']) for d in needed}
+    else:
+        with timed(trace, "parse_json"):
+            datasets_dict = {d: json.loads(dataset_lines[d]) for d in set(needed) | {'original'}}
+        # Altered datasets stored as delta files are overlaid on the original question-item
+        for d, item in datasets_dict.items():
+            if is_delta(item):
+                datasets_dict[d] = apply_delta(datasets_dict['original'], item)
+    return process_item(pq, datasets_dict, results_dict, method, rog_budget=rog_budget, graphs=graphs, variants=variants,
+                        trace=trace, fuzzy=fuzzy)
+
+def split_row(result):
+    """
+    Split a detailed row into its cacheable parts: "pq" for the fields shared by all datasets,
+    and one part per dataset for the fields prefixed with its name.
+    """
+    parts = {"pq": {}}
+    for key, value in result.items():
+        dataset = next((d for d in DATASETS if key.startswith(f"{d}_")), "pq")
+        parts.setdefault(dataset, {})[key] = value
+    return parts
 
-                    result = process_item(pq, datasets_dict, results_dict, method)
-                    res_list.append(result)
+def join_row(parts):
+    """
+    Assemble the parts of a detailed row in the field order of process_item.
+    """
+    row = dict(parts["pq"])
+    for dataset in DATASETS:
+        row.update(parts[dataset])
+    return row
+
+def plan_jobs(bundles, cache, options):
+    """
+    Look up the parts of each detailed row in the cache and yield (keys, cached parts, bundle, variants) jobs,
+    where variants lists the datasets to recompute, and bundle is None if every part is cached.
+    A part is keyed by the digests of the inputs it depends on: the original and altered question-items
+    and the results record (and ground paths record, if any) for a dataset, the original question-item and the PQ
+    record for the PQ fields.
+    Without a cache, every job recomputes the whole row.
+    """
+    for bundle in bundles:
+        if cache is None:
+            yield None, None, bundle, None
+            continue
+        dataset_lines, results_lines, pq_line, ground_lines = bundle
+        if dataset_lines is None:
+            question_id = json.loads(pq_line)['id']
+            digests = {d: store.digest(question_id) for d, store in _graph_stores.items()}
+        else:
+            digests = {d: line_digest(line) for d, line in dataset_lines.items()}
+        keys = {"pq": cache_key("pq", options, digests['original'], line_digest(pq_line))}
+        for d in DATASETS:
+            inputs = [digests['original'], digests[d], line_digest(results_lines[d])]
+            if ground_lines is not None and ground_lines.get(d) is not None:
+                inputs.append(line_digest(ground_lines[d]))
+            keys[d] = cache_key(d, options, *inputs)
+        cached = {part: cache.get(key) for part, key in keys.items()}
+        variants = [d for d in DATASETS if cached[d] is None]
+        if cached["pq"] is not None and not variants:
+            bundle = None
+        yield keys, cached, bundle, variants
+
+def process_job(job, method, rog_budget=None, traced=False, fuzzy=None):
+    """
+    Complete the detailed row of a job, computing only its parts missing from the cache.
+    Return the cache keys, the row, the newly computed parts, and, if traced, the time spent on the job
+    and its RunTrace (otherwise None).
+    """
+    keys, cached, bundle, variants = job
+    trace = None
+    if traced:
+        trace = RunTrace()
+        start = perf_counter()
+    if cached is None:
+        row, fresh = process_bundle(bundle, method, rog_budget=rog_budget, trace=trace, fuzzy=fuzzy), {}
+    else:
+        fresh = {}
+        if bundle is not None:
+            parts = split_row(process_bundle(bundle, method, rog_budget=rog_budget, variants=variants, trace=trace,
+                                             fuzzy=fuzzy))
+            fresh = {part: fields for part, fields in parts.items() if cached[part] is None}
+        row = join_row(dict(cached, **fresh))
+    return keys, row, fresh, None if trace is None else (perf_counter() - start, trace)
+
+def process_chunk(chunk, method, rog_budget=None, traced=False, fuzzy=None):
+    """
+    Process a chunk of jobs in a worker process.
+    """
+    return [process_job(job, method, rog_budget=rog_budget, traced=traced, fuzzy=fuzzy) for job in chunk]
+
+def imap_ordered(pool, func, chunks, max_pending):
+    """
+    Submit chunks to the pool while keeping at most max_pending of them in flight,
+    and yield their results in submission order as soon as they are ready.
+    """
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(func, (chunk,)))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().get()
+    while pending:
+        yield from pending.popleft().get()
+
+def run(method, model, workers=1, chunk_size=32, rog_budget=None, use_store=True, use_cache=True, checkpoint_every=64,
+        trace_dir=None, pq_path=None, fuzzy=None, dataset_dir="datasets", results_dir="results",
+        output_dir="results_detailed"):
+    """
+    Produce the detailed results of a method and model, streaming them to the output file in question order.
+    With workers > 1, chunks of question-items are processed by a pool of worker processes;
+    the output is identical to the serial run.
+    With use_store, the datasets are read from their precompiled graph stores instead of their JSONL files.
+    With use_cache, the parts of the rows whose inputs did not change since a previous run are taken from
+    {output_dir}/.cache, and the new parts are saved every checkpoint_every question-items, so an
+    interrupted run resumes where it stopped. The output file is only replaced once complete.
+    With trace_dir, the per-stage timers and counters of the run and its slowest questions are written
+    to {trace_dir}/{method}-{model}-trace.json.
+    The datasets are read from dataset_dir, the results from results_dir, and the output is written to output_dir;
+    pq_path defaults to {results_dir}/PQ-{model}-original.jsonl.
+    With fuzzy (a similarity threshold), the answers are also matched fuzzily, and the run is named
+    {method}-{model}-fuzzy instead of {method}-{model} in the output, cache and trace file names.
+    """
+    dataset_paths = {d: dataset_source(dataset_dir, d) for d in DATASETS}
+    results_paths = {d: os.path.join(results_dir, f"{method}-{model}-{d}.jsonl") for d in DATASETS}
+    pq_path = pq_path or os.path.join(results_dir, f"PQ-{model}-original.jsonl")
+    # ToG results have no ground paths: they are taken from the RoG results of the same model
+    ground_paths = None
+    if method == "ToG":
+        ground_paths = {d: os.path.join(results_dir, f"RoG-{model}-{d}.jsonl") for d in DATASETS}
+        ground_paths = {d: p for d, p in ground_paths.items() if os.path.exists(p)}
+    run_name = f"{method}-{model}" if fuzzy is None else f"{method}-{model}-fuzzy"
+    output_path = os.path.join(output_dir, f"{run_name}-detailed.jsonl")
+
+    cache = ResultCache(os.path.join(output_dir, ".cache", f"{run_name}.jsonl")) if use_cache else None
+    options = {"method": method, "rog_budget": rog_budget}
+    if fuzzy is not None:
+        options["fuzzy"] = fuzzy
+    trace = RunTrace() if trace_dir else None
+    run_start = perf_counter()
+    bundles = read_bundles(None if use_store else dataset_paths, results_paths, pq_path, ground_paths=ground_paths)
+    jobs = plan_jobs(bundles, cache, options)
+    with ExitStack() as stack:
+        if use_store:
+            open_graph_stores(dataset_paths)
+            stack.callback(close_graph_stores)
+        if workers > 1:
+            initializer, initargs = (open_graph_stores, (dataset_paths,)) if use_store else (None, ())
+            pool = stack.enter_context(Pool(workers, initializer=initializer, initargs=initargs))
+            func = partial(process_chunk, method=method, rog_budget=rog_budget, traced=trace is not None, fuzzy=fuzzy)
+            results = imap_ordered(pool, func, chunked(jobs, chunk_size), max_pending=2 * workers)
+        else:
+            results = map(partial(process_job, method=method, rog_budget=rog_budget, traced=trace is not None, fuzzy=fuzzy),
+                          jobs)
+
+        n_rows = n_computed = 0
+        os.makedirs(output_dir, exist_ok=True)
+        tmp_path = output_path + ".tmp"
+        try:
+            with JsonlWriter(tmp_path) as writer:
+                for keys, row, fresh, job_trace in results:
+                    if job_trace is not None:
+                        trace.merge_question(row['id'], *job_trace, cached=cache is not None and not fresh)
+                    writer.write(row)
+                    for part, fields in fresh.items():
+                        cache.put(keys[part], fields)
+                    n_rows += 1
+                    n_computed += bool(fresh)
+                    if cache is not None and n_rows % checkpoint_every == 0:
+                        cache.checkpoint()
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            # Also on KeyboardInterrupt: a rerun resumes from the cache checkpoints, not from the partial output
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    if cache is not None:
+        cache.compact()
+        print(f"Recomputed {n_computed} of {n_rows} question-items, the others were cached.")
+    if trace is not None:
+        trace.write(os.path.join(trace_dir, f"{run_name}-trace.json"), method=method, model=model,
+                    run_seconds=perf_counter() - run_start, workers=workers, rog_budget=rog_budget,
+                    use_store=use_store, use_cache=use_cache, fuzzy=fuzzy)
+
+def run_all(workers=1, chunk_size=32, rog_budget=None, use_store=True, use_cache=True, checkpoint_every=64, trace_dir=None,
+            fuzzy=None):
+    models = ["nano", "standard"]
+    methods = ["GCR", "RoG", "ToG"]
+
+    for method in methods:
+        for model in models:
+            print(f"Processing method '{method}' and model '{model}'...")
+            run(method, model, workers=workers, chunk_size=chunk_size, rog_budget=rog_budget, use_store=use_store,
+                use_cache=use_cache, checkpoint_every=checkpoint_every, trace_dir=trace_dir, fuzzy=fuzzy)
 
-            write_jsonl(res_list, f"results_detailed/{method}-{model}-detailed.jsonl")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Produce the detailed per-question results of ToG, RoG, and GCR.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (default: 1, i.e. serial)")
+    parser.add_argument("--chunk-size", type=int, default=32,
+                        help="number of question-items sent to a worker at once (default: 32)")
+    parser.add_argument("--rog-budget", type=int, default=None,
+                        help="maximum number of nodes visited by each RoG path search (default: unlimited)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="parse the dataset JSONL files instead of reading their precompiled graph stores")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="recompute every row instead of reusing the cached rows whose inputs did not change")
+    parser.add_argument("--checkpoint-every", type=int, default=64,
+                        help="number of question-items between two saves of the cache (default: 64)")
+    parser.add_argument("--trace-dir", default=None,
+                        help="write a JSON trace of the stage timings, counters and slowest questions of each run to this directory")
+    parser.add_argument("--fuzzy", nargs="?", type=float, const=FUZZY_THRESHOLD, default=None, metavar="THRESHOLD",
+                        help="also match the answers fuzzily, with this similarity threshold (default: %(const)s), "
+                             "writing the results to {method}-{model}-fuzzy-detailed.jsonl")
+    args = parser.parse_args(argv)
+    run_all(workers=args.workers, chunk_size=args.chunk_size, rog_budget=args.rog_budget, use_store=not args.no_store,
+            use_cache=not args.no_cache, checkpoint_every=args.checkpoint_every, trace_dir=args.trace_dir,
+            fuzzy=args.fuzzy)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,115 @@
+import json
+import os
+import numpy as np
+
+# Tables loaded by load_detailed_table while a session is open (see cli.py), by path, with the size and
+# modification time of their file: a session keeps them in memory across commands until the file changes
+_session_tables = None
+
+class DetailedTable:
+    """
+    Columnar view of a results_detailed file: one NumPy array per field, one row per question-item.
+    Integer fields such as "{dataset}_adh" become int64 arrays; the other fields (ids, lists) become object arrays.
+    Indexing with a field name returns its column, indexing with a boolean mask or an index array returns
+    the table restricted to those rows, and iterating yields the rows as dicts, like a list of question-items.
+    """
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+        self._len = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_items(cls, item_list):
+        """
+        Build a table from a list of question-items (dicts with the same fields).
+        """
+        keys = {}
+        for item in item_list:
+            for key in item:
+                keys.setdefault(key, None)
+        columns = {}
+        for key in keys:
+            values = [item.get(key) for item in item_list]
+            if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+                columns[key] = np.array(values, dtype=np.int64)
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+                columns[key] = column
+        return cls(columns)
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return DetailedTable({name: column[key] for name, column in self.columns.items()})
+
+    def filter(self, mask):
+        """
+        Return the table restricted to the rows where the boolean mask is True.
+        """
+        return self[np.asarray(mask, dtype=bool)]
+
+    def row(self, i) -> dict:
+        """
+        Return the i-th row as a question-item dict.
+        """
+        return {name: column[i].item() if column.dtype != object else column[i] for name, column in self.columns.items()}
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self.row(i)
+
+def start_session():
+    """
+    Keep the tables loaded from now on in memory, so that loading the same unchanged file again returns the same table.
+    """
+    global _session_tables
+    if _session_tables is None:
+        _session_tables = {}
+
+def clear_session():
+    """
+    Drop the tables kept in memory by the session.
+    """
+    if _session_tables is not None:
+        _session_tables.clear()
+
+def session_tables():
+    """
+    Return the paths of the tables kept in memory by the session, with their number of rows.
+    """
+    return {path: len(table) for path, (_, table) in (_session_tables or {}).items()}
+
+def load_detailed_table(file_path) -> DetailedTable:
+    """
+    Read a results_detailed JSONL file into a DetailedTable.
+    In a session (see start_session), the table of an unchanged file is only read once.
+    """
+    if _session_tables is not None:
+        stat = os.stat(file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = _session_tables.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        table = _read_detailed_table(file_path)
+        _session_tables[file_path] = (signature, table)
+        return table
+    return _read_detailed_table(file_path)
+
+def _read_detailed_table(file_path) -> DetailedTable:
+    item_list = []
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if line:
+                try:
+                    item_list.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Error in line {line_number}: {e}")
+    return DetailedTable.from_items(item_list)
@@ -1,4 +1,5 @@
-from utils import read_jsonl, compute_metrics, compute_metrics_pq
+from utils import compute_metrics, compute_metrics_pq
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -7,7 +8,7 @@ def main():
 
     for model in models:
         path = f"results_detailed/GCR-{model}-detailed.jsonl"
-        item_list = read_jsonl(path)
+        item_list = load_detailed_table(path)
 
         pq_adh, pq_res, pq_inc = compute_metrics_pq(item_list)
         pq_adh = pq_adh / len(item_list)
@@ -18,7 +19,7 @@ def main():
 
         for method in methods:            
             path = f"results_detailed/{method}-{model}-detailed.jsonl"
-            item_list = read_jsonl(path)
+            item_list = load_detailed_table(path)
 
             for dataset in datasets:
                 adh, res, inc = compute_metrics(item_list, dataset)
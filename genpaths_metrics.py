@@ -1,9 +1,12 @@
-from utils import read_jsonl
+from utils import is_table
+from detailed_table import load_detailed_table
 
 def count_q_less_k_paths(item_list, dataset, k=3):
     """
     Count the number of questions that have less than k paths for the given dataset.
     """
+    if is_table(item_list):
+        return int((item_list[f"{dataset}_n_path"] < k).sum())
     count = 0
     for item in item_list:
         if item[f"{dataset}_n_path"] < k:
@@ -14,6 +17,8 @@ def count_q_no_existing_paths(item_list, dataset):
     """
     Count the number of questions that have no existing paths for the given dataset.
     """
+    if is_table(item_list):
+        return int((item_list[f"{dataset}_path_existing"] == 0).sum())
     count = 0
     for item in item_list:
         if item[f"{dataset}_path_existing"] == 0:
@@ -24,6 +29,8 @@ def count_q_no_correct_paths(item_list, dataset):
     """
     Count the number of questions that have no correct paths for the given dataset.
     """
+    if is_table(item_list):
+        return int((item_list[f"{dataset}_path_correct"] == 0).sum())
     count = 0
     for item in item_list:
         if item[f"{dataset}_path_correct"] == 0:
@@ -34,6 +41,8 @@ def count_q_at_least_one_correct_path(item_list, dataset):
     """
     Count the number of questions that have at least one correct path for the given dataset.
     """
+    if is_table(item_list):
+        return int((item_list[f"{dataset}_path_correct"] >= 1).sum())
     count = 0
     for item in item_list:
         if item[f"{dataset}_path_correct"] >= 1:
@@ -44,6 +53,9 @@ def count_q_only_correct_paths(item_list, dataset):
     """
     Count the number of questions that have only correct paths (i.e., all paths are correct) for the given dataset.
     """
+    if is_table(item_list):
+        n_path = item_list[f"{dataset}_n_path"]
+        return int(((n_path > 0) & (n_path == item_list[f"{dataset}_path_correct"])).sum())
     count = 0
     for item in item_list:
         if item[f"{dataset}_n_path"] > 0 and item[f"{dataset}_n_path"] == item[f"{dataset}_path_correct"]:
@@ -54,6 +66,8 @@ def count_total_paths(item_list, dataset):
     """
     Count the total number of paths across all questions for the given dataset.
     """
+    if is_table(item_list):
+        return int(item_list[f"{dataset}_n_path"].sum())
     total = 0
     for item in item_list:
         total += item[f"{dataset}_n_path"]
@@ -63,6 +77,8 @@ def count_non_existing_paths(item_list, dataset):
     """
     Count the total number of non-existing paths across all questions for the given dataset.
     """
+    if is_table(item_list):
+        return int((item_list[f"{dataset}_n_path"] - item_list[f"{dataset}_path_existing"]).sum())
     total = 0
     for item in item_list:
         total += item[f"{dataset}_n_path"] - item[f"{dataset}_path_existing"]
@@ -72,6 +88,8 @@ def count_correct_paths(item_list, dataset):
     """
     Count the total number of correct paths across all questions for the given dataset.
     """
+    if is_table(item_list):
+        return int(item_list[f"{dataset}_path_correct"].sum())
     total = 0
     for item in item_list:
         total += item[f"{dataset}_path_correct"]
@@ -83,7 +101,7 @@ def main():
 
     for method in methods:
         path = f"results_detailed/{method}-nano-detailed.jsonl"
-        item_list = read_jsonl(path)
+        item_list = load_detailed_table(path)
 
         for dataset in datasets:
             print(f"Method: {method}, Dataset: {dataset}")
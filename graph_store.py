@@ -0,0 +1,224 @@
+import json
+import mmap
+import os
+from array import array
+from compact_graph import CompactGraph, build_compact_graph
+from result_cache import line_digest
+from dataset_delta import DeltaResolver
+
+# Binary store of precompiled question subgraphs.
+# Layout: magic, offset of the footer, one record per question-item, footer (JSON).
+# A record is a fixed header of int64 counts, the item without its graph (JSON), the entity and relation names
+# (NUL-separated), then the int32 arrays of the undirected CompactGraph and the interned (head, relation, tail)
+# triplets in their original order. Integers use the native byte order, the store is a local cache.
+# The footer maps each question id to the offset and length of its record and the digest of its source line.
+# A store can be compiled from a delta file (see dataset_delta); the footer then also records the signature of its base files.
+STORE_MAGIC = b"KGSTORE1"
+STORE_VERSION = 2
+_HEADER_FIELDS = ("meta_len", "names_len", "n_nodes", "n_relations", "n_slots", "n_rel_ids", "n_triples",
+                  "n_edges", "n_directed_edges", "has_graph")
+_HEADER_SIZE = 8 * len(_HEADER_FIELDS)
+
+def store_path_for(source_path):
+    """
+    Return the path of the graph store compiled from a dataset JSONL or delta file.
+    """
+    root, _ = os.path.splitext(source_path)
+    return root + ".graphs"
+
+def _source_signature(source_path):
+    stat = os.stat(source_path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns, "version": STORE_VERSION}
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+def _encode_record(item) -> bytes:
+    """
+    Encode a question-item and its precompiled graph as a store record.
+    """
+    triplets = item.get("graph")
+    has_graph = isinstance(triplets, list)
+    graph = build_compact_graph(triplets if has_graph else [], undirected=True)
+    meta = {k: v for k, v in item.items() if k != "graph"}
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    names = graph.nodes + graph.relations
+    if any("\x00" in name for name in names):
+        raise ValueError(f"Entity or relation name containing NUL in question {item.get('id')}")
+    names_bytes = "\x00".join(names).encode("utf-8")
+
+    triples = array('i')
+    for h, r, t in triplets if has_graph else []:
+        triples.extend((graph.node_ids[h.strip()], graph.relation_ids[r.strip()], graph.node_ids[t.strip()]))
+    n_directed_edges = len(set(zip(triples[0::3], triples[2::3])))
+
+    header = array('q', [len(meta_bytes), len(names_bytes), len(graph.nodes), len(graph.relations),
+                         len(graph.neighbors), len(graph.rel_ids), len(triples) // 3,
+                         graph.n_edges, n_directed_edges, int(has_graph)])
+    parts = [header.tobytes(), meta_bytes, names_bytes, bytes(_pad(len(meta_bytes) + len(names_bytes)))]
+    for values in (graph.offsets, graph.neighbors, graph.rel_offsets, graph.rel_ids, triples):
+        parts.append(array('i', values).tobytes())
+    return b"".join(parts)
+
+def compile_graph_store(source_path, store_path=None):
+    """
+    Compile every question-item of a dataset JSONL or delta file into a graph store, keyed by question id.
+    The store is written to a temporary file and moved in place, so readers never see a partial store.
+    """
+    store_path = store_path or store_path_for(source_path)
+    signature = _source_signature(source_path)
+    index = {}
+    order = []
+    tmp_path = store_path + ".tmp"
+    resolver = DeltaResolver(os.path.dirname(source_path))
+    with open(source_path, "r", encoding="utf-8") as src, open(tmp_path, "wb") as out:
+        out.write(STORE_MAGIC)
+        out.write(bytes(8))
+        offset = len(STORE_MAGIC) + 8
+        for line_number, line in enumerate(src, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error in line {line_number}: {e}")
+                continue
+            item = resolver.resolve(item)
+            record = _encode_record(item)
+            if item["id"] not in index:
+                index[item["id"]] = (offset, len(record), line_digest(line))
+                order.append(item["id"])
+            out.write(record)
+            offset += len(record)
+        bases = {name: _source_signature(base.path) for name, base in resolver.bases.items()}
+        footer = dict(signature, source=os.path.basename(source_path), bases=bases, order=order, index=index)
+        out.write(json.dumps(footer, ensure_ascii=False).encode("utf-8"))
+        out.seek(len(STORE_MAGIC))
+        out.write(array('q', [offset]).tobytes())
+    resolver.close()
+    os.replace(tmp_path, store_path)
+    return store_path
+
+class GraphStore:
+    """
+    Read-only, memory-mapped view of a graph store.
+    Opening a store only parses its footer; graphs are decoded on demand as CompactGraphs
+    whose adjacency arrays are zero-copy views of the mapped file.
+    """
+
+    def __init__(self, store_path):
+        self.path = store_path
+        with open(store_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        if bytes(self._buffer[:len(STORE_MAGIC)]) != STORE_MAGIC:
+            raise ValueError(f"Not a graph store: {store_path}")
+        footer_offset = self._buffer[len(STORE_MAGIC):len(STORE_MAGIC) + 8].cast('q')[0]
+        self.footer = json.loads(bytes(self._buffer[footer_offset:]).decode("utf-8"))
+        self.ids = self.footer["order"]
+        self._index = self.footer["index"]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, question_id):
+        return question_id in self._index
+
+    def _record(self, question_id):
+        offset, length, _ = self._index[question_id]
+        record = self._buffer[offset:offset + length]
+        header = dict(zip(_HEADER_FIELDS, record[:_HEADER_SIZE].cast('q')))
+        return header, record
+
+    def digest(self, question_id) -> str:
+        """
+        Return the content digest of the source line of a question-item.
+        """
+        return self._index[question_id][2]
+
+    def item(self, question_id) -> dict:
+        """
+        Return the question-item without its graph.
+        """
+        header, record = self._record(question_id)
+        return json.loads(bytes(record[_HEADER_SIZE:_HEADER_SIZE + header["meta_len"]]).decode("utf-8"))
+
+    def _arrays(self, header, record):
+        start = _HEADER_SIZE + header["meta_len"] + header["names_len"]
+        start += _pad(header["meta_len"] + header["names_len"])
+        ints = record[start:].cast('i')
+        sizes = (header["n_nodes"] + 1, header["n_slots"], header["n_slots"] + 1, header["n_rel_ids"], 3 * header["n_triples"])
+        arrays = []
+        position = 0
+        for size in sizes:
+            arrays.append(ints[position:position + size])
+            position += size
+        return arrays
+
+    def graph(self, question_id) -> CompactGraph:
+        """
+        Return the undirected CompactGraph of a question, backed by the mapped file.
+        """
+        header, record = self._record(question_id)
+        start = _HEADER_SIZE + header["meta_len"]
+        names = bytes(record[start:start + header["names_len"]]).decode("utf-8")
+        names = names.split("\x00") if header["n_nodes"] + header["n_relations"] else []
+        offsets, neighbors, rel_offsets, rel_ids, _ = self._arrays(header, record)
+        return CompactGraph(names[:header["n_nodes"]], names[header["n_nodes"]:], offsets, neighbors,
+                            rel_offsets, rel_ids, True, header["n_edges"])
+
+    def triples(self, question_id):
+        """
+        Return the interned (head, relation, tail) ids of the triplets of a question, flattened, in their original order.
+        """
+        header, record = self._record(question_id)
+        return self._arrays(header, record)[4]
+
+    def counts(self, question_id):
+        """
+        Return the number of nodes and of directed edges of the graph of a question,
+        or (None, None) if the question-item has no graph.
+        """
+        header, _ = self._record(question_id)
+        if not header["has_graph"]:
+            return None, None
+        return header["n_nodes"], header["n_directed_edges"]
+
+    def close(self):
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Graphs handed out still reference the mapping; it is unmapped once they are garbage collected
+            pass
+
+def is_store_fresh(source_path, store_path=None) -> bool:
+    """
+    Check if the graph store exists and was compiled from the current version of the source file,
+    and of its base files if the source is a delta file.
+    """
+    store_path = store_path or store_path_for(source_path)
+    if not os.path.exists(store_path):
+        return False
+    try:
+        store = GraphStore(store_path)
+    except (ValueError, json.JSONDecodeError):
+        return False
+    signature = _source_signature(source_path)
+    fresh = all(store.footer.get(key) == value for key, value in signature.items())
+    for name, base_signature in store.footer.get("bases", {}).items():
+        base_path = os.path.join(os.path.dirname(source_path), name)
+        fresh = fresh and os.path.exists(base_path) and _source_signature(base_path) == base_signature
+    store.close()
+    return fresh
+
+def open_graph_store(source_path, store_path=None) -> GraphStore:
+    """
+    Open the graph store of a dataset JSONL or delta file, (re)compiling it first if it is missing or stale.
+    """
+    store_path = store_path or store_path_for(source_path)
+    if not is_store_fresh(source_path, store_path):
+        print(f"Compiling graph store {store_path}...")
+        compile_graph_store(source_path, store_path)
+    return GraphStore(store_path)
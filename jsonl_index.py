@@ -0,0 +1,102 @@
+import json
+import mmap
+import os
+
+# Sidecar index of a JSONL file, stored next to it as {file}.idx: a JSON object with the size and modification
+# time of the indexed file, the question ids in file order, and the byte offset and length of the line of each id.
+INDEX_VERSION = 1
+
+def index_path_for(path):
+    """
+    Return the path of the sidecar index of a JSONL file.
+    """
+    return path + ".idx"
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns, "version": INDEX_VERSION}
+
+def build_jsonl_index(path, index_path=None) -> dict:
+    """
+    Scan a JSONL file once and write its sidecar index, mapping each question id to the (offset, length)
+    of its line, newline excluded. Lines that are not valid JSON are reported and skipped;
+    when an id occurs on several lines, the first one is kept.
+    """
+    index_path = index_path or index_path_for(path)
+    signature = _source_signature(path)
+    index = {}
+    order = []
+    offset = 0
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            length = len(line.rstrip(b"\r\n"))
+            if line.strip():
+                try:
+                    question_id = json.loads(line)["id"]
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
+                    print(f"Error in line {line_number} of {path}: {e!r}")
+                else:
+                    if question_id not in index:
+                        index[question_id] = (offset, length)
+                        order.append(question_id)
+            offset += len(line)
+    data = dict(signature, order=order, index=index)
+    # One temporary file per process, as several processes may index the same file at once
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+    return data
+
+def load_jsonl_index(path, index_path=None) -> dict:
+    """
+    Return the sidecar index of a JSONL file, (re)building it first if it is missing or stale.
+    """
+    index_path = index_path or index_path_for(path)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            data = {}
+        signature = _source_signature(path)
+        if all(data.get(key) == value for key, value in signature.items()):
+            return data
+    return build_jsonl_index(path, index_path)
+
+class JsonlFile:
+    """
+    Random access by question id to the records of a JSONL file, memory-mapped and located through its sidecar index.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        data = load_jsonl_index(path, index_path)
+        self.ids = data["order"]
+        self._index = data["index"]
+        with open(path, "rb") as f:
+            # mmap cannot map an empty file
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, question_id):
+        return question_id in self._index
+
+    def line(self, question_id) -> bytes:
+        """
+        Return the raw JSON line of a question, without its newline.
+        """
+        offset, length = self._index[question_id]
+        return self._mmap[offset:offset + length]
+
+    def record(self, question_id) -> dict:
+        """
+        Return the parsed record of a question.
+        """
+        return json.loads(self.line(question_id))
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
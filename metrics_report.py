@@ -0,0 +1,178 @@
+from utils import (compute_metrics, compute_metrics_pq, compute_errors, filter_by_one_correct_path, filter_by_one_existing_path,
+                   filter_by_pq_correct, filter_by_pq_incorrect, count_no_existing_paths, sum_field)
+from detailed_table import load_detailed_table
+from genpaths_metrics import (count_q_less_k_paths, count_q_no_existing_paths, count_q_no_correct_paths,
+                              count_q_at_least_one_correct_path, count_q_only_correct_paths, count_total_paths,
+                              count_non_existing_paths, count_correct_paths)
+import argparse
+import glob
+import json
+import os
+
+DATASETS = ["original", "slight", "significant", "comical", "uncomp"]
+
+def ratio(numerator, denominator):
+    """
+    Return numerator / denominator, or None if the denominator is zero.
+    """
+    return numerator / denominator if denominator else None
+
+def pct(value):
+    return "n/a" if value is None else f"{value:.0%}"
+
+def rates(adh, res, inc, total):
+    return {"adh": ratio(adh, total), "res": ratio(res, total), "inc": ratio(inc, total), "n": total}
+
+def path_method_metrics(table):
+    """
+    Compute every metric family of a GCR or RoG detailed file: answer rates, rates on questions with a correct path,
+    rates split by PQ correctness, failure attribution, generated path statistics, prior and context bias.
+    """
+    n = len(table)
+    datasets = {}
+    for dataset in DATASETS:
+        with_path = filter_by_one_correct_path(table, dataset)
+        pq_correct = filter_by_pq_correct(with_path)
+        pq_incorrect = filter_by_pq_incorrect(with_path)
+        err_tot, err_from_path, err_from_fa = compute_errors(table, dataset)
+        n_paths = count_total_paths(table, dataset)
+        datasets[dataset] = {
+            "rates": rates(*compute_metrics(table, dataset), n),
+            "correct_path_rates": rates(*compute_metrics(with_path, dataset), len(with_path)),
+            "pq_split": {
+                "adh_pq_correct": ratio(sum_field(pq_correct, f"{dataset}_adh"), len(pq_correct)),
+                "res_pq_correct": ratio(sum_field(pq_correct, f"{dataset}_res"), len(pq_correct)),
+                "adh_pq_incorrect": ratio(sum_field(pq_incorrect, f"{dataset}_adh"), len(pq_incorrect)),
+                # Prior bias (original) and context bias (altered datasets) as in compute_prior_bias / compute_context_bias
+                "inc_pq_incorrect": ratio(sum_field(pq_incorrect, f"{dataset}_inc"), len(pq_incorrect)),
+            },
+            "errors": {"total": err_tot, "from_path": ratio(err_from_path, err_tot), "from_fa": ratio(err_from_fa, err_tot)},
+            "paths": {
+                "q_less_3_paths": ratio(count_q_less_k_paths(table, dataset), n),
+                "q_no_existing_paths": ratio(count_q_no_existing_paths(table, dataset), n),
+                "q_no_correct_paths": ratio(count_q_no_correct_paths(table, dataset), n),
+                "q_at_least_one_correct_path": ratio(count_q_at_least_one_correct_path(table, dataset), n),
+                "q_only_correct_paths": ratio(count_q_only_correct_paths(table, dataset), n),
+                "total_paths": n_paths,
+                "non_existing_paths": ratio(count_non_existing_paths(table, dataset), n_paths),
+                "correct_paths": ratio(count_correct_paths(table, dataset), n_paths),
+            },
+        }
+    bias = {
+        "prior": datasets[DATASETS[0]]["pq_split"]["inc_pq_incorrect"],
+        "context": {dataset: datasets[dataset]["pq_split"]["adh_pq_correct"] for dataset in DATASETS[1:]},
+    }
+    return {"n_questions": n, "datasets": datasets, "bias": bias}
+
+def tog_metrics(table):
+    """
+    Compute the metrics of a ToG detailed file: coverage of questions with at least one path
+    and answer rates over the questions with at least one path.
+    """
+    n = len(table)
+    datasets = {}
+    for dataset in DATASETS:
+        with_path = filter_by_one_existing_path(table, dataset)
+        adh, res, inc = compute_metrics(with_path, dataset)
+        no_paths = count_no_existing_paths(table, dataset)
+        datasets[dataset] = {
+            "q_one_path": ratio(len(with_path), n),
+            "rates": rates(adh, res, inc, adh + res + inc),
+            "no_paths": {"count": no_paths, "ratio": ratio(no_paths, n)},
+        }
+    return {"n_questions": n, "datasets": datasets}
+
+def find_detailed_files(directory="results_detailed"):
+    """
+    Return the {(method, model): path} of the detailed files in the directory.
+    """
+    runs = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*-detailed.jsonl"))):
+        name = os.path.basename(path)[:-len("-detailed.jsonl")]
+        method, _, model = name.partition("-")
+        if model:
+            runs[(method, model)] = path
+    return runs
+
+def compute_report(runs, load=load_detailed_table):
+    """
+    Load each detailed file once and compute all the metric families for every method, model and dataset.
+    """
+    report = {"pq": {}, "runs": []}
+    for (method, model), path in sorted(runs.items()):
+        table = load(path)
+        # The PQ columns are the same in every detailed file of a model; fa_metrics reads them from GCR
+        if model not in report["pq"] or method == "GCR":
+            report["pq"][model] = rates(*compute_metrics_pq(table), len(table))
+        metrics = tog_metrics(table) if method == "ToG" else path_method_metrics(table)
+        report["runs"].append(dict(method=method, model=model, path=path, **metrics))
+    return report
+
+def format_report(report):
+    """
+    Render the report as text, one section per metric family, in the format of the single-metric scripts.
+    """
+    path_runs = [run for run in report["runs"] if run["method"] != "ToG"]
+    tog_runs = [run for run in report["runs"] if run["method"] == "ToG"]
+    lines = ["== Adherence, resistance and incorrectness =="]
+    for model, r in report["pq"].items():
+        lines.append(f"Model: {model}, Method: PQ, Dataset: Original - Adh: {pct(r['adh'])}, Res: {pct(r['res'])}, Inc: {pct(r['inc'])}")
+    for run in path_runs:
+        for dataset, d in run["datasets"].items():
+            r = d["rates"]
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - Adh: {pct(r['adh'])}, Res: {pct(r['res'])}, Inc: {pct(r['inc'])}")
+
+    lines.append("\n== Questions with at least one correct path ==")
+    for run in path_runs:
+        for dataset, d in run["datasets"].items():
+            r = d["correct_path_rates"]
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - Adh: {pct(r['adh'])}, Res: {pct(r['res'])}, Inc: {pct(r['inc'])}")
+
+    lines.append("\n== Split by PQ correctness ==")
+    for run in path_runs:
+        for dataset, d in run["datasets"].items():
+            s = d["pq_split"]
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - Adh_pq_cor: {pct(s['adh_pq_correct'])}, Res_pq_cor: {pct(s['res_pq_correct'])}, Adh_pq_inc: {pct(s['adh_pq_incorrect'])}")
+
+    lines.append("\n== Bias ==")
+    for run in path_runs:
+        b = run["bias"]
+        lines.append(f"Model: {run['model']}, Method: {run['method']} -> Prior Bias: {pct(b['prior'])}, Context Biases: {[pct(cb) for cb in b['context'].values()]}")
+
+    lines.append("\n== Failure attribution ==")
+    for run in path_runs:
+        for dataset, d in run["datasets"].items():
+            e = d["errors"]
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - Err tot: {e['total']}, Err from Path: {pct(e['from_path'])}, Err from FA: {pct(e['from_fa'])}")
+
+    lines.append("\n== Generated paths ==")
+    for run in path_runs:
+        for dataset, d in run["datasets"].items():
+            p = d["paths"]
+            lines.append(f"Model: {run['model']}, Method: {run['method']}, Dataset: {dataset} - Questions: {run['n_questions']}, "
+                         f"<3 paths: {pct(p['q_less_3_paths'])}, no existing: {pct(p['q_no_existing_paths'])}, "
+                         f"no correct: {pct(p['q_no_correct_paths'])}, >=1 correct: {pct(p['q_at_least_one_correct_path'])}, "
+                         f"only correct: {pct(p['q_only_correct_paths'])}, paths: {p['total_paths']}, "
+                         f"non-existing: {pct(p['non_existing_paths'])}, correct: {pct(p['correct_paths'])}")
+
+    lines.append("\n== ToG ==")
+    for run in tog_runs:
+        for dataset, d in run["datasets"].items():
+            r = d["rates"]
+            lines.append(f"Model: {run['model']}, Dataset: {dataset} - Q_one_path: {pct(d['q_one_path'])} - Adh: {pct(r['adh'])}, Res: {pct(r['res'])}, Inc: {pct(r['inc'])}, "
+                         f"No paths count: {d['no_paths']['count']}, {pct(d['no_paths']['ratio'])}")
+    return "\n".join(lines)
+
+def main(directory="results_detailed", json_path=None):
+    report = compute_report(find_detailed_files(directory))
+    print(format_report(report))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute every metric of the detailed results in one pass per file.")
+    parser.add_argument("--dir", default="results_detailed", help="directory of the detailed files (default: results_detailed)")
+    parser.add_argument("--json", default=None, help="also write the report as JSON to this path")
+    args = parser.parse_args()
+    main(directory=args.dir, json_path=args.json)
@@ -1,4 +1,5 @@
-from utils import read_jsonl, compute_metrics, filter_by_one_correct_path
+from utils import compute_metrics, filter_by_one_correct_path
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -8,7 +9,7 @@ def main():
     for model in models:
         for method in methods:            
             path = f"results_detailed/{method}-{model}-detailed.jsonl"
-            item_list = read_jsonl(path)
+            item_list = load_detailed_table(path)
             
             for dataset in datasets:
                 filtered_item_list = filter_by_one_correct_path(item_list, dataset)
@@ -0,0 +1,130 @@
+from typing import List
+from compact_graph import CompactGraph
+from utils import PATH_EXISTS, PATH_MISSING, PATH_BUDGET_EXCEEDED
+
+class PathTrie:
+    """
+    Prefix trie over the " -> "-separated tokens of a list of generated paths.
+    Duplicated paths end on the same trie node, and paths sharing a prefix share its trie nodes,
+    so a graph walk over the trie checks every distinct prefix once.
+    """
+
+    def __init__(self, paths):
+        # Each trie node is [children: token -> node, indices of the paths ending at the node]
+        self.root = [{}, []]
+        for i, path in enumerate(paths):
+            node = self.root
+            for token in path.split(" -> "):
+                child = node[0].get(token)
+                if child is None:
+                    child = node[0][token] = [{}, []]
+                node = child
+            node[1].append(i)
+
+def _mark_budget_exceeded(graph: CompactGraph, node, outcomes):
+    """
+    Mark as PATH_BUDGET_EXCEEDED every path ending in the subtree of the given trie node, unless it already exists.
+    Paths going through a relation missing from the graph are skipped, as a single search rejects them upfront.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for i in node[1]:
+            if outcomes[i] != PATH_EXISTS:
+                outcomes[i] = PATH_BUDGET_EXCEEDED
+        stack.extend(child for token, child in node[0].items() if graph.relation_id(token) is not None)
+
+def _walk_gcr(graph: CompactGraph, trie: PathTrie, q_entity, outcomes):
+    """
+    Walk the trie of reasoning paths [entity, relation, entity, ...] on the graph.
+    Only the branches starting from a question entity are walked, and each entity -> relation -> entity
+    step is checked once for all the paths sharing it.
+    Return the number of entity steps walked.
+    """
+    steps = 0
+    for entity in set(q_entity):
+        first = trie.root[0].get(entity)
+        start = graph.node_id(entity)
+        if first is None or start is None:
+            continue
+        # Stack of (entity trie node, entity id, depth in tokens)
+        stack = [(first, start, 0)]
+        while stack:
+            node, u, depth = stack.pop()
+            steps += 1
+            if depth >= 2:
+                for i in node[1]:
+                    outcomes[i] = PATH_EXISTS
+            for relation_token, relation_node in node[0].items():
+                relation = graph.relation_id(relation_token)
+                if relation is None:
+                    continue
+                for entity_token, entity_node in relation_node[0].items():
+                    v = graph.node_id(entity_token)
+                    if v is not None and graph.has_edge_relation(u, v, relation):
+                        stack.append((entity_node, v, depth + 2))
+    return steps
+
+def _walk_rog(graph: CompactGraph, trie: PathTrie, q_entity, outcomes, budget=None):
+    """
+    Walk the trie of relation paths on the graph with one frontier search per question entity.
+    Visits are counted along each trie branch exactly as search_relation_path counts them for a single path,
+    so the per-path budget gives the same outcomes as checking the paths one at a time.
+    Return the number of nodes expanded, over all the branches.
+    """
+    expanded = 0
+    for entity in q_entity:
+        start = graph.node_id(entity)
+        if start is None:
+            continue
+        # Stack of (trie node, frontier of node ids reached by its prefix, visits spent on the prefix)
+        stack = [(trie.root, {start}, 0)]
+        while stack:
+            node, frontier, visited = stack.pop()
+            for token, child in node[0].items():
+                relation = graph.relation_id(token)
+                if relation is None:
+                    continue
+                pending = [i for i in child[1] if outcomes[i] != PATH_EXISTS]
+                next_frontier = set()
+                child_visited = visited
+                exceeded = False
+                for u in frontier:
+                    child_visited += 1
+                    if budget is not None and child_visited > budget:
+                        exceeded = True
+                        break
+                    for v in graph.neighbors_by_relation(u, relation):
+                        if pending:
+                            for i in pending:
+                                outcomes[i] = PATH_EXISTS
+                            pending = []
+                        next_frontier.add(v)
+                expanded += child_visited - visited
+                if exceeded:
+                    _mark_budget_exceeded(graph, child, outcomes)
+                elif next_frontier and child[0]:
+                    stack.append((child, next_frontier, child_visited))
+    return expanded
+
+def validate_paths(paths: List[str], graph: CompactGraph, q_entity, method, budget=None, stats=None) -> List[str]:
+    """
+    Check all the predicted paths of a question at once, according to the specified method (GCR or RoG).
+    Return the outcome (PATH_EXISTS, PATH_MISSING or PATH_BUDGET_EXCEEDED) of each path, in input order,
+    with the same semantics as utils.path_existence applied to each path separately.
+    If stats is given (a Counter), the entity steps of the GCR walk or the nodes expanded by the RoG walk
+    are added to its "gcr_steps" or "rog_nodes_visited" count.
+    """
+    outcomes = [PATH_MISSING] * len(paths)
+    if method not in ("GCR", "RoG") or not paths:
+        return outcomes
+    trie = PathTrie(paths)
+    if method == "GCR":
+        steps = _walk_gcr(graph, trie, q_entity, outcomes)
+        if stats is not None:
+            stats["gcr_steps"] += steps
+    else:
+        expanded = _walk_rog(graph, trie, q_entity, outcomes, budget=budget)
+        if stats is not None:
+            stats["rog_nodes_visited"] += expanded
+    return outcomes
@@ -0,0 +1,253 @@
+from detail_results import DATASETS, run as run_detailed
+from dataset_delta import DELTA_SUFFIX, dataset_source
+from graph_store import open_graph_store, store_path_for
+from metrics_report import compute_report, format_report
+from bootstrap_metrics import compute_bootstrap, format_bootstrap
+import argparse
+import glob
+import json
+import os
+import queue
+import re
+import sys
+import traceback
+from multiprocessing import Pool
+from time import perf_counter
+
+# Raw results files are named {method}-{model}-{variant}.jsonl; the model name may contain dashes
+RUN_FILE = re.compile(r"^(?P<method>[^-]+)-(?P<model>.+)-(?P<variant>[^-]+)\.jsonl$")
+
+class Job:
+    """
+    A step of the pipeline: func(**kwargs) reads the input files and writes the output files,
+    once the jobs named in deps are done.
+    """
+
+    def __init__(self, name, func, kwargs, inputs, outputs, deps=()):
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+
+    def missing_inputs(self):
+        return [path for path in self.inputs if not os.path.exists(path)]
+
+    def is_up_to_date(self) -> bool:
+        """
+        Check if every output exists and is newer than every input.
+        """
+        if not all(os.path.exists(path) for path in self.outputs):
+            return False
+        if not self.inputs:
+            return True
+        return min(os.path.getmtime(path) for path in self.outputs) >= max(os.path.getmtime(path) for path in self.inputs)
+
+def discover_runs(results_dir="results"):
+    """
+    Find the raw results files and return the {(method, model): {variant: path}} of the methods,
+    and the {model: path} of the PQ results on the original dataset (method "pq" in any case).
+    """
+    runs, pq_paths = {}, {}
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.jsonl"))):
+        match = RUN_FILE.match(os.path.basename(path))
+        if match is None:
+            continue
+        method, model, variant = match.group("method", "model", "variant")
+        if method.lower() == "pq":
+            if variant == "original":
+                pq_paths[model] = path
+        else:
+            runs.setdefault((method, model), {})[variant] = path
+    return runs, pq_paths
+
+def dataset_inputs(variant, dataset_dir="datasets"):
+    """
+    Return the files a dataset variant is read from: its JSONL or delta file, and the base file of a delta file
+    (named by its first record, as dataset_delta writes every record of a file against the same base).
+    """
+    source = dataset_source(dataset_dir, variant)
+    paths = [source]
+    if source.endswith(DELTA_SUFFIX) and os.path.exists(source):
+        with open(source, "r", encoding="utf-8") as f:
+            first = next((line for line in f if line.strip()), None)
+        base = json.loads(first).get("delta_of") if first else None
+        if base:
+            paths.append(os.path.join(dataset_dir, base))
+    return paths
+
+def compile_store(source_path):
+    open_graph_store(source_path).close()
+
+def write_metrics_report(detailed_paths, report_dir):
+    report = compute_report(detailed_paths)
+    os.makedirs(report_dir, exist_ok=True)
+    with open(os.path.join(report_dir, "metrics_report.txt"), "w", encoding="utf-8") as f:
+        f.write(format_report(report) + "\n")
+    with open(os.path.join(report_dir, "metrics_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def write_bootstrap_report(detailed_paths, report_dir, n_resamples=10000, seed=0):
+    report = compute_bootstrap(detailed_paths, n_resamples=n_resamples, seed=seed)
+    os.makedirs(report_dir, exist_ok=True)
+    with open(os.path.join(report_dir, "bootstrap.txt"), "w", encoding="utf-8") as f:
+        f.write(format_bootstrap(report) + "\n")
+    with open(os.path.join(report_dir, "bootstrap.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def plan_jobs(results_dir="results", dataset_dir="datasets", detailed_dir="results_detailed", report_dir="reports",
+              use_store=True, use_cache=True, n_resamples=10000, seed=0):
+    """
+    Build the dependency graph of the pipeline from the results files found, in topological order:
+    a graph store per dataset variant, a detailed file per method and model with results on every dataset variant
+    and PQ results, then the reports over all the detailed files.
+    """
+    runs, pq_paths = discover_runs(results_dir)
+    jobs = []
+    store_jobs = []
+    if use_store:
+        for variant in DATASETS:
+            source = dataset_source(dataset_dir, variant)
+            job = Job(f"store:{variant}", compile_store, {"source_path": source},
+                      dataset_inputs(variant, dataset_dir), [store_path_for(source)])
+            store_jobs.append(job.name)
+            jobs.append(job)
+
+    detailed_paths = {}
+    for (method, model), variants in sorted(runs.items()):
+        missing = [d for d in DATASETS if d not in variants]
+        if missing or model not in pq_paths:
+            missing += [] if model in pq_paths else [f"PQ results of {model}"]
+            print(f"Skipping {method}-{model}: no results for {', '.join(missing)}")
+            continue
+        inputs = [variants[d] for d in DATASETS] + [pq_paths[model]]
+        inputs += sorted({path for d in DATASETS for path in dataset_inputs(d, dataset_dir)})
+        if method == "ToG":
+            # Ground paths of the ToG results, see detail_results.run
+            inputs += [path for d, path in sorted(runs.get(("RoG", model), {}).items()) if d in DATASETS]
+        output = os.path.join(detailed_dir, f"{method}-{model}-detailed.jsonl")
+        kwargs = {"method": method, "model": model, "use_store": use_store, "use_cache": use_cache,
+                  "pq_path": pq_paths[model],
+                  "dataset_dir": dataset_dir, "results_dir": results_dir, "output_dir": detailed_dir}
+        jobs.append(Job(f"detailed:{method}-{model}", run_detailed, kwargs, inputs, [output], store_jobs))
+        detailed_paths[(method, model)] = output
+
+    # The reports also cover the detailed files already present whose results are gone
+    for path in sorted(glob.glob(os.path.join(detailed_dir, "*-detailed.jsonl"))):
+        method, _, model = os.path.basename(path)[:-len("-detailed.jsonl")].partition("-")
+        if model:
+            detailed_paths.setdefault((method, model), path)
+    if detailed_paths:
+        deps = [job.name for job in jobs if job.name.startswith("detailed:")]
+        inputs = sorted(detailed_paths.values())
+        jobs.append(Job("report:metrics", write_metrics_report, {"detailed_paths": detailed_paths, "report_dir": report_dir},
+                        inputs, [os.path.join(report_dir, "metrics_report.txt"), os.path.join(report_dir, "metrics_report.json")],
+                        deps))
+        jobs.append(Job("report:bootstrap", write_bootstrap_report,
+                        {"detailed_paths": detailed_paths, "report_dir": report_dir, "n_resamples": n_resamples, "seed": seed},
+                        inputs, [os.path.join(report_dir, "bootstrap.txt"), os.path.join(report_dir, "bootstrap.json")],
+                        deps))
+    return jobs
+
+def call_job(name, func, kwargs):
+    """
+    Run a job and return its name, its duration, and the traceback of its error (None if it succeeded).
+    """
+    start = perf_counter()
+    try:
+        func(**kwargs)
+    except Exception:
+        return name, perf_counter() - start, traceback.format_exc()
+    return name, perf_counter() - start, None
+
+def run_jobs(jobs, workers=1, force=False, dry_run=False):
+    """
+    Run the jobs in dependency order, the independent ones on a pool of worker processes if workers > 1.
+    A job is skipped if its outputs are newer than its inputs (unless force), or if some of its inputs are missing
+    but its outputs exist, which are then kept as they are. A job whose inputs are missing without outputs is
+    reported as missing, and the jobs depending on a failed job are not run. With dry_run, the jobs that
+    would run are only listed.
+    Return the {name: status} of the jobs, status being "done", "skipped", "missing" or "failed".
+    """
+    status = {}
+    pending = list(jobs)
+    finished = queue.Queue()
+    pool = Pool(workers) if workers > 1 and not dry_run else None
+    n_running = 0
+
+    def record(result):
+        name, seconds, error = result
+        if error is None:
+            print(f"[{name}] done in {seconds:.1f}s")
+            status[name] = "done"
+        else:
+            print(f"[{name}] failed after {seconds:.1f}s:\n{error}")
+            status[name] = "failed"
+
+    try:
+        while pending or n_running:
+            for job in list(pending):
+                dep_status = [status.get(dep) for dep in job.deps]
+                if None in dep_status:
+                    continue
+                pending.remove(job)
+                missing = job.missing_inputs()
+                if "failed" in dep_status:
+                    print(f"[{job.name}] not run: a job it depends on failed")
+                    status[job.name] = "failed"
+                elif missing and all(os.path.exists(path) for path in job.outputs):
+                    print(f"[{job.name}] skipped: missing {', '.join(missing)}, keeping the existing outputs")
+                    status[job.name] = "skipped"
+                elif missing:
+                    print(f"[{job.name}] not run: missing {', '.join(missing)}")
+                    status[job.name] = "missing"
+                elif not force and not (dry_run and "done" in dep_status) and job.is_up_to_date():
+                    # In a dry run, the jobs that would run do not update the inputs of the jobs depending on them
+                    print(f"[{job.name}] up to date")
+                    status[job.name] = "skipped"
+                elif dry_run:
+                    print(f"[{job.name}] would run")
+                    status[job.name] = "done"
+                elif pool is None:
+                    print(f"[{job.name}] running...")
+                    record(call_job(job.name, job.func, job.kwargs))
+                else:
+                    print(f"[{job.name}] started")
+                    pool.apply_async(call_job, (job.name, job.func, job.kwargs), callback=finished.put,
+                                     error_callback=lambda e, name=job.name: finished.put((name, 0.0, repr(e))))
+                    n_running += 1
+            if n_running:
+                record(finished.get())
+                n_running -= 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return status
+
+def run_pipeline(workers=1, force=False, dry_run=False, use_store=True, use_cache=True, n_resamples=10000, seed=0):
+    jobs = plan_jobs(use_store=use_store, use_cache=use_cache, n_resamples=n_resamples, seed=seed)
+    status = run_jobs(jobs, workers=workers, force=force, dry_run=dry_run)
+    counts = {s: sum(1 for v in status.values() if v == s) for s in ("done", "skipped", "missing", "failed")}
+    print(f"{len(status)} jobs: {counts['done']} {'to run' if dry_run else 'run'}, {counts['skipped']} skipped, "
+          f"{counts['missing']} missing inputs, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the stages of the analysis whose inputs changed: "
+                                                 "graph stores, detailed results of every run found in results/, and reports.")
+    parser.add_argument("--workers", type=int, default=1, help="number of jobs run at once (default: 1)")
+    parser.add_argument("--force", action="store_true", help="run every job, even if its outputs are up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only list the jobs that would run")
+    parser.add_argument("--no-store", action="store_true",
+                        help="parse the dataset JSONL files instead of compiling and reading their graph stores")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every row of the detailed results")
+    parser.add_argument("--resamples", type=int, default=10000, help="number of bootstrap resamples (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the bootstrap resampling (default: 0)")
+    args = parser.parse_args(argv)
+    return run_pipeline(workers=args.workers, force=args.force, dry_run=args.dry_run, use_store=not args.no_store,
+                        use_cache=not args.no_cache, n_resamples=args.resamples, seed=args.seed)
+
+if __name__ == "__main__":
+    sys.exit(main())
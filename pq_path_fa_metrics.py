@@ -1,4 +1,5 @@
-from utils import read_jsonl, filter_by_one_correct_path, filter_by_pq_correct, filter_by_pq_incorrect, compute_metrics
+from utils import filter_by_one_correct_path, filter_by_pq_correct, filter_by_pq_incorrect, compute_metrics
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -8,7 +9,7 @@ def main():
     for model in models:
         for method in methods:            
             path = f"results_detailed/{method}-{model}-detailed.jsonl"
-            item_list = read_jsonl(path)
+            item_list = load_detailed_table(path)
             for dataset in datasets:
                 filtered_item_list = filter_by_one_correct_path(item_list, dataset)
                 filtered_item_list_pq_correct = filter_by_pq_correct(filtered_item_list)
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+# Bump when the computation of the detailed results changes, to invalidate every cached entry
+CACHE_VERSION = 3
+
+def line_digest(line) -> str:
+    """
+    Return the content digest of a raw JSONL line (surrounding whitespace ignored).
+    """
+    if isinstance(line, str):
+        line = line.strip().encode("utf-8")
+    else:
+        line = line.strip()
+    return hashlib.blake2b(line, digest_size=16).hexdigest()
+
+def cache_key(part, options, *digests) -> str:
+    """
+    Return the cache key of a part of a detailed row ("pq" or a dataset name),
+    from the options of the run and the digests of the inputs the part depends on.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([CACHE_VERSION, part, options], sort_keys=True).encode("utf-8"))
+    for digest in digests:
+        h.update(digest.encode("ascii"))
+    return h.hexdigest()
+
+class ResultCache:
+    """
+    Content-addressed cache of the parts of the detailed rows, persisted as a JSONL file of {"key", "fields"} entries.
+    New entries are appended at every checkpoint, so an interrupted run resumes from the last checkpoint.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.used = set()
+        self._pending = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line of a checkpoint interrupted while writing
+                        continue
+                    self.entries[entry["key"]] = entry["fields"]
+
+    def get(self, key):
+        fields = self.entries.get(key)
+        if fields is not None:
+            self.used.add(key)
+        return fields
+
+    def put(self, key, fields):
+        self.entries[key] = fields
+        self.used.add(key)
+        self._pending.append({"key": key, "fields": fields})
+
+    def checkpoint(self):
+        """
+        Append the entries added since the last checkpoint to the cache file.
+        """
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._pending = []
+
+    def compact(self):
+        """
+        Rewrite the cache file with only the entries used by this run, dropping the stale ones.
+        """
+        self.checkpoint()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key in self.used:
+                f.write(json.dumps({"key": key, "fields": self.entries[key]}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
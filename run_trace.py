@@ -0,0 +1,112 @@
+import heapq
+import json
+import os
+from collections import Counter
+from time import perf_counter
+
+class _StageTimer:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_time(self.name, perf_counter() - self.start)
+        return False
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_TIMER = _NoTimer()
+
+def timed(trace, name):
+    """
+    Return a context manager adding the wall-clock time of its block to the stage name of the trace,
+    or a shared no-op context manager if trace is None.
+    """
+    return _NO_TIMER if trace is None else _StageTimer(trace, name)
+
+class RunTrace:
+    """
+    Per-stage wall-clock timers and counters of a detail_results run, with the slowest questions.
+    A trace is filled for each question, possibly in a worker process, then merged into the trace of the run.
+    """
+
+    def __init__(self, n_slowest=20):
+        # stage name -> [total seconds, number of calls]
+        self.stages = {}
+        self.counters = Counter()
+        self.n_questions = 0
+        self.n_cached = 0
+        self.total_seconds = 0.0
+        self.n_slowest = n_slowest
+        # Min-heap of (seconds, question id, stage seconds, counters) of the slowest questions
+        self._slowest = []
+
+    def add_time(self, name, seconds):
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            stage[0] += seconds
+            stage[1] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def merge_question(self, question_id, seconds, question_trace, cached=False):
+        """
+        Add the trace of one question, which took seconds in total, to the trace of the run.
+        A question whose row was entirely taken from the cache is only counted in n_cached, so that it does not
+        dilute the per-question figures of the questions actually processed.
+        """
+        for name, (stage_seconds, calls) in question_trace.stages.items():
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] += stage_seconds
+            stage[1] += calls
+        self.counters.update(question_trace.counters)
+        if cached:
+            self.n_cached += 1
+            return
+        self.n_questions += 1
+        self.total_seconds += seconds
+        entry = (seconds, question_id, {name: s for name, (s, _) in question_trace.stages.items()}, dict(question_trace.counters))
+        if len(self._slowest) < self.n_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def to_dict(self) -> dict:
+        counters = dict(self.counters)
+        for name in ("rog_nodes_visited", "gcr_steps"):
+            if name in counters and counters.get("paths_checked"):
+                counters[f"{name}_per_path"] = counters[name] / counters["paths_checked"]
+        return {
+            "n_questions": self.n_questions,
+            "n_cached_questions": self.n_cached,
+            "question_seconds": self.total_seconds,
+            "stages": {name: {"seconds": s, "calls": calls} for name, (s, calls) in
+                       sorted(self.stages.items(), key=lambda item: -item[1][0])},
+            "counters": counters,
+            "slowest_questions": [{"id": question_id, "seconds": seconds, "stages": stages, "counters": question_counters}
+                                  for seconds, question_id, stages, question_counters in sorted(self._slowest, reverse=True)],
+        }
+
+    def write(self, path, **info):
+        """
+        Write the trace as JSON, along with the given run information (method, model, options).
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(info, **self.to_dict()), f, ensure_ascii=False, indent=2)
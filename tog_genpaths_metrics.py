@@ -1,4 +1,5 @@
-from utils import read_jsonl, count_no_existing_paths
+from utils import count_no_existing_paths
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -7,7 +8,7 @@ def main():
 
     for model in models:
         path = f"results_detailed/{method}-{model}-detailed.jsonl"
-        item_list = read_jsonl(path)
+        item_list = load_detailed_table(path)
 
         for dataset in datasets:    
             no_paths_count = count_no_existing_paths(item_list, dataset)
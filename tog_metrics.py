@@ -1,4 +1,5 @@
-from utils import read_jsonl, compute_metrics, filter_by_one_existing_path
+from utils import compute_metrics, filter_by_one_existing_path
+from detailed_table import load_detailed_table
 
 def main():
     models = ["nano", "standard"]
@@ -7,7 +8,7 @@ def main():
 
     for model in models:
         path = f"results_detailed/{method}-{model}-detailed.jsonl"
-        item_list = read_jsonl(path)
+        item_list = load_detailed_table(path)
 
         for dataset in datasets:    
             item_list_filtered = filter_by_one_existing_path(item_list, dataset)